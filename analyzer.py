@@ -1,7 +1,308 @@
 import json
+import numpy as np
 import pandas as pd
 import sqlite3
-from collections import Counter
+from collections import Counter, deque
+
+COLOR_MAP = {
+    '红': [1, 2, 7, 8, 12, 13, 18, 19, 23, 24, 29, 30, 34, 35, 40, 45, 46],
+    '蓝': [3, 4, 9, 10, 14, 15, 20, 25, 26, 31, 36, 37, 41, 42, 47, 48],
+    '绿': [5, 6, 11, 16, 17, 21, 22, 27, 28, 32, 33, 38, 39, 43, 44, 49]
+}
+NUM_TO_COLOR = {n: c for c, nums in COLOR_MAP.items() for n in nums}
+
+ZODIAC_ORDER = ['鼠', '牛', '虎', '兔', '龍', '蛇', '馬', '羊', '猴', '雞', '狗', '豬']
+WUXING_ORDER = ['金', '木', '水', '火', '土']
+COLOR_ORDER = ['红', '蓝', '绿']
+
+RELATIONS_CHONG = {'鼠':'馬', '馬':'鼠', '牛':'羊', '羊':'牛', '虎':'猴', '猴':'虎', '兔':'雞', '雞':'兔', '龍':'狗', '狗':'龍', '蛇':'豬', '豬':'蛇'}
+WUXING_SHENG = {'金':'水', '水':'木', '木':'火', '火':'土', '土':'金'}
+
+STREAK_ATTRIBUTES = ('color', 'zodiac', 'size', 'parity')
+
+def get_wuxing_map(ref_year):
+    nayin_cycle = ['金', '火', '木', '土', '金', '火', '水', '土', '金', '木',
+                   '水', '土', '火', '木', '水', '金', '火', '木', '土', '金',
+                   '火', '水', '土', '金', '木', '水', '土', '火', '木', '水']
+    wuxing_map = {w: [] for w in WUXING_ORDER}
+    for num in range(1, 50):
+        target_year = ref_year - num + 1
+        pair_index = (((target_year - 1984) % 60) + 60) % 60 // 2
+        wuxing_map[nayin_cycle[pair_index]].append(num)
+    return wuxing_map
+
+def special_attributes(record):
+    """提取特码的 波色/生肖/大小/单双 四个属性"""
+    special = record['special']
+    return {
+        'color': NUM_TO_COLOR.get(special, '未知'),
+        'zodiac': record['special_zodiac'],
+        'size': '大' if special >= 25 else '小',
+        'parity': '单' if special % 2 != 0 else '双'
+    }
+
+class StreakIndex:
+    """特码连开(游程)索引：一次构建，每期 extend 追加。
+
+    当前连开长度与历史连开长度分布均为 O(1) 查询，无需再从最新一期倒序回扫。
+    records 需按期号升序传入。
+    """
+
+    def __init__(self, records=()):
+        self.current = {attr: (None, 0) for attr in STREAK_ATTRIBUTES}
+        self.finished = {attr: Counter() for attr in STREAK_ATTRIBUTES}
+        for record in records:
+            self.extend(record)
+
+    def extend(self, record):
+        for attr, value in special_attributes(record).items():
+            last_value, length = self.current[attr]
+            if value == last_value:
+                self.current[attr] = (value, length + 1)
+            else:
+                if length:
+                    self.finished[attr][length] += 1
+                self.current[attr] = (value, 1)
+
+    def current_streak(self, attr):
+        """返回 (当前连开的属性值, 连开期数)"""
+        return self.current[attr]
+
+    def streak_distribution(self, attr):
+        """历史已结束的连开长度分布 {长度: 次数} (不含仍在进行中的当前连开)"""
+        return self.finished[attr]
+
+    def to_dict(self):
+        return {
+            attr: {
+                "current_value": self.current[attr][0],
+                "current_length": self.current[attr][1],
+                "distribution": {str(k): v for k, v in sorted(self.finished[attr].items())}
+            }
+            for attr in STREAK_ATTRIBUTES
+        }
+
+class TransitionMatrices:
+    """相邻特码转移计数矩阵：号码 49x49、生肖 12x12、五行 5x5、波色 3x3，支持多个滞后期 lag。
+
+    每期 extend 只做常数次计数累加；条件分布直接由矩阵行归一化得到，不再回扫历史。
+    records 需按期号升序传入，且带有 date 字段(用于按年份确定五行归属)。
+    """
+
+    KINDS = {
+        'number': [str(n) for n in range(1, 50)],
+        'zodiac': ZODIAC_ORDER,
+        'wuxing': WUXING_ORDER,
+        'color': COLOR_ORDER
+    }
+
+    def __init__(self, records=(), lags=(1,)):
+        self.lags = tuple(sorted(set(lags)))
+        self.counts = {
+            kind: {lag: np.zeros((len(labels), len(labels)), dtype=np.int64) for lag in self.lags}
+            for kind, labels in self.KINDS.items()
+        }
+        self.recent = deque(maxlen=max(self.lags))
+        self.num_to_wuxing_by_year = {}
+        for record in records:
+            self.extend(record)
+
+    def _num_to_wuxing(self, year):
+        if year not in self.num_to_wuxing_by_year:
+            wuxing_map = get_wuxing_map(year)
+            self.num_to_wuxing_by_year[year] = {n: w for w, nums in wuxing_map.items() for n in nums}
+        return self.num_to_wuxing_by_year[year]
+
+    def _states(self, record):
+        special = record['special']
+        wuxing = self._num_to_wuxing(int(record['date'][:4])).get(special)
+        zodiac = record['special_zodiac']
+        color = NUM_TO_COLOR.get(special)
+        return {
+            'number': special - 1,
+            'zodiac': ZODIAC_ORDER.index(zodiac) if zodiac in ZODIAC_ORDER else None,
+            'wuxing': WUXING_ORDER.index(wuxing) if wuxing in WUXING_ORDER else None,
+            'color': COLOR_ORDER.index(color) if color in COLOR_ORDER else None
+        }
+
+    def extend(self, record):
+        states = self._states(record)
+        for lag in self.lags:
+            if len(self.recent) < lag:
+                continue
+            prev = self.recent[-lag]
+            for kind, matrices in self.counts.items():
+                if prev[kind] is not None and states[kind] is not None:
+                    matrices[lag][prev[kind], states[kind]] += 1
+        self.recent.append(states)
+
+    def conditional(self, kind, prev_value, lag=1):
+        """P(下一期 | lag 期前为 prev_value)，返回 {标签: 概率}；该状态从未出现过时返回空字典"""
+        labels = self.KINDS[kind]
+        row = self.counts[kind][lag][labels.index(str(prev_value) if kind == 'number' else prev_value)]
+        total = row.sum()
+        if total == 0:
+            return {}
+        return {label: float(c / total) for label, c in zip(labels, row)}
+
+    def next_distribution(self, kind, lag=1):
+        """以最新几期为条件，给出下一期的条件分布"""
+        if len(self.recent) < lag or self.recent[-lag][kind] is None:
+            return {}
+        return self.conditional(kind, self.KINDS[kind][self.recent[-lag][kind]], lag)
+
+    def _rule_rate(self, matrix, pairs):
+        """规则命中率与独立假设下的期望命中率"""
+        total = matrix.sum()
+        if total == 0:
+            return {"samples": 0, "observed": 0.0, "expected": 0.0, "lift": 0.0}
+        row_p = matrix.sum(axis=1) / total
+        col_p = matrix.sum(axis=0) / total
+        observed = sum(matrix[i, j] for i, j in pairs) / total
+        expected = sum(row_p[i] * col_p[j] for i, j in pairs)
+        return {
+            "samples": int(total),
+            "observed": round(float(observed), 4),
+            "expected": round(float(expected), 4),
+            "lift": round(float(observed / expected), 4) if expected else 0.0
+        }
+
+    def rule_checks(self, lag=1):
+        """用转移矩阵检验 backtest.py 中的相冲/相生/邻号启发式规则"""
+        chong_pairs = [(ZODIAC_ORDER.index(a), ZODIAC_ORDER.index(b)) for a, b in RELATIONS_CHONG.items()]
+        sheng_pairs = [(WUXING_ORDER.index(a), WUXING_ORDER.index(b)) for a, b in WUXING_SHENG.items()]
+        neighbour_pairs = [(i, j) for i in range(49) for j in (i - 1, i + 1) if 0 <= j < 49]
+        return {
+            "zodiac_chong": self._rule_rate(self.counts['zodiac'][lag], chong_pairs),
+            "wuxing_sheng": self._rule_rate(self.counts['wuxing'][lag], sheng_pairs),
+            "number_neighbour": self._rule_rate(self.counts['number'][lag], neighbour_pairs)
+        }
+
+    def to_dict(self):
+        return {
+            str(lag): {
+                "next_distribution": {kind: self.next_distribution(kind, lag) for kind in ('zodiac', 'wuxing', 'color')},
+                "rule_checks": self.rule_checks(lag)
+            }
+            for lag in self.lags
+        }
+
+class GapEngine:
+    """号码间隔(遗漏)引擎：统计每个号码相邻两次出现之间的全部历史间隔。
+
+    初始构建完全向量化；新开一期时 extend 只更新本期 7 个号码，代价为常数。
+    间隔与遗漏的口径一致：正码或特码出现即视为开出，间隔 = 两次开出之间相隔的期数。
+    records 需按期号升序传入。数组均以号码本身为下标 (长度 50，下标 0 不使用)。
+    """
+
+    def __init__(self, records=()):
+        records = list(records)
+        self.total = len(records)
+        self.last_seen = np.full(50, -1, dtype=np.int64)
+        self.hist = np.zeros((50, 64), dtype=np.int64)
+        if not records:
+            return
+
+        draws = np.array([r['numbers'] + [r['special']] for r in records], dtype=np.int64)
+        hits = np.zeros((self.total, 50), dtype=bool)
+        hits[np.arange(self.total)[:, None], draws] = True
+
+        # 按号码展开全部出现位置 (先按号码、再按期序排列)
+        nums, rows = np.nonzero(hits.T)
+        same_num = nums[1:] == nums[:-1]
+        gaps = (rows[1:] - rows[:-1] - 1)[same_num]
+        gap_nums = nums[1:][same_num]
+        if len(gaps):
+            self._ensure_width(gaps.max() + 1)
+            np.add.at(self.hist, (gap_nums, gaps), 1)
+
+        # 每个号码最后一次出现的位置：取每段同号码的末尾元素，避免依赖重复下标赋值的写入顺序
+        is_last = np.append(nums[1:] != nums[:-1], True)
+        self.last_seen[nums[is_last]] = rows[is_last]
+
+    @classmethod
+    def from_dict(cls, gap_stats, total):
+        """由 to_dict 的输出还原引擎，复用分析阶段已算好的全量间隔分布"""
+        engine = cls()
+        engine.total = total
+        for key, stats in gap_stats.items():
+            n = int(key)
+            miss = stats['current_miss']
+            engine.last_seen[n] = -1 if miss >= total else total - 1 - miss
+            for gap, count in stats['histogram'].items():
+                engine._ensure_width(int(gap) + 1)
+                engine.hist[n, int(gap)] = count
+        return engine
+
+    def _ensure_width(self, width):
+        if width > self.hist.shape[1]:
+            grown = np.zeros((50, max(width, self.hist.shape[1] * 2)), dtype=np.int64)
+            grown[:, :self.hist.shape[1]] = self.hist
+            self.hist = grown
+
+    def extend(self, record):
+        for n in set(record['numbers'] + [record['special']]):
+            if self.last_seen[n] >= 0:
+                gap = self.total - self.last_seen[n] - 1
+                self._ensure_width(gap + 1)
+                self.hist[n, gap] += 1
+            self.last_seen[n] = self.total
+        self.total += 1
+
+    def current_misses(self):
+        """当前遗漏值；从未开出过的号码遗漏值为总期数"""
+        return np.where(self.last_seen >= 0, self.total - 1 - self.last_seen, self.total)
+
+    def gap_counts(self):
+        return self.hist.sum(axis=1)
+
+    def mean_gaps(self):
+        counts = self.gap_counts()
+        weighted = self.hist @ np.arange(self.hist.shape[1])
+        return np.divide(weighted, counts, out=np.zeros(50), where=counts > 0)
+
+    def max_gaps(self):
+        nonzero = self.hist > 0
+        last_col = self.hist.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis=1)
+        return np.where(nonzero.any(axis=1), last_col, 0)
+
+    def miss_percentiles(self):
+        """当前遗漏值在该号码自身历史间隔中的百分位 (严格小于当前遗漏的历史间隔占比, 0~100)"""
+        misses = self.current_misses()
+        counts = self.gap_counts()
+        cum = self.hist.cumsum(axis=1)
+        below = np.where(
+            misses > 0,
+            cum[np.arange(50), np.clip(misses - 1, 0, self.hist.shape[1] - 1)],
+            0
+        )
+        return np.divide(below * 100.0, counts, out=np.zeros(50), where=counts > 0)
+
+    def quantiles(self, q, default=0):
+        """每个号码历史间隔的 q 分位数；没有间隔样本的号码返回 default"""
+        counts = self.gap_counts()
+        cum = self.hist.cumsum(axis=1)
+        target = np.ceil(q * counts)
+        idx = np.argmax(cum >= np.maximum(target, 1)[:, None], axis=1)
+        return np.where(counts > 0, idx, default)
+
+    def to_dict(self):
+        counts = self.gap_counts()
+        mean_gaps = self.mean_gaps()
+        max_gaps = self.max_gaps()
+        percentiles = self.miss_percentiles()
+        misses = self.current_misses()
+        return {
+            str(n): {
+                "samples": int(counts[n]),
+                "mean_gap": round(float(mean_gaps[n]), 2),
+                "max_gap": int(max_gaps[n]),
+                "current_miss": int(misses[n]),
+                "miss_percentile": round(float(percentiles[n]), 1),
+                "histogram": {str(g): int(c) for g, c in enumerate(self.hist[n]) if c}
+            }
+            for n in range(1, 50)
+        }
 
 def get_records_from_db(db_path='lottery.db'):
     """从 SQLite 数据库提取结构化数据"""
@@ -24,7 +325,7 @@ def get_records_from_db(db_path='lottery.db'):
         })
     return records
 
-def analyze_data(db_file='lottery.db', output_file='analysis_result.json', chart_file='chart_data.json'):
+def analyze_data(db_file='lottery.db', output_file='analysis_result.json', chart_file='chart_data.json', transition_lags=(1,)):
     print(">>> 正在进行深度数据清洗与 BI 数据集构建(从数据库拉取)...")
     records = get_records_from_db(db_file)
 
@@ -35,15 +336,11 @@ def analyze_data(db_file='lottery.db', output_file='analysis_result.json', chart
     total_records = len(df)
     date_range = f"{df['date'].min().split()[0]} ~ {df['date'].max().split()[0]}"
 
-    # 1. 计算遗漏值
-    miss_values = {}
-    for n in range(1, 50):
-        miss = 0
-        for record in records:
-            if n in record['numbers'] or n == record['special']:
-                break
-            miss += 1
-        miss_values[n] = miss
+    # 1. 计算遗漏值与全量间隔分布
+    gap_engine = GapEngine(reversed(records))
+    current_misses = gap_engine.current_misses()
+    miss_values = {n: int(current_misses[n]) for n in range(1, 50)}
+    gap_stats = gap_engine.to_dict()
 
     # 2. 计算近50期冷热号
     recent_50 = records[:50]
@@ -55,22 +352,23 @@ def analyze_data(db_file='lottery.db', output_file='analysis_result.json', chart
     hot_cold = {n: counter_50.get(n, 0) for n in range(1, 50)}
 
     # 3. 计算生肖与波色分布 (特码)
-    COLOR_MAP = {
-        '红': [1, 2, 7, 8, 12, 13, 18, 19, 23, 24, 29, 30, 34, 35, 40, 45, 46],
-        '蓝': [3, 4, 9, 10, 14, 15, 20, 25, 26, 31, 36, 37, 41, 42, 47, 48],
-        '绿': [5, 6, 11, 16, 17, 21, 22, 27, 28, 32, 33, 38, 39, 43, 44, 49]
-    }
-    NUM_TO_COLOR = {n: c for c, nums in COLOR_MAP.items() for n in nums}
-    
     zodiac_counts = dict(Counter([r['special_zodiac'] for r in records]))
     color_counts = dict(Counter([NUM_TO_COLOR.get(r['special'], '未知') for r in records]))
 
+    # 4. 特码连开游程索引 (波色/生肖/大小/单双)
+    streak_index = StreakIndex(reversed(records))
+
+    # 5. 相邻特码转移矩阵 (号码/生肖/五行/波色)
+    transitions = TransitionMatrices(reversed(records), lags=transition_lags)
+
     analysis_result = {
         "total_records": total_records,
         "date_range": date_range,
         "miss_values": miss_values,
         "recent_50_hot": [k for k, v in counter_50.most_common(10)],
-        "recent_50_cold": [k for k, v in counter_50.most_common()[-10:]]
+        "recent_50_cold": [k for k, v in counter_50.most_common()[-10:]],
+        "transitions": transitions.to_dict(),
+        "gap_percentiles": {n: stats["miss_percentile"] for n, stats in gap_stats.items()}
     }
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(analysis_result, f, ensure_ascii=False, indent=2)
@@ -79,7 +377,11 @@ def analyze_data(db_file='lottery.db', output_file='analysis_result.json', chart
         "miss_values": miss_values,
         "hot_cold": hot_cold,
         "zodiac_counts": zodiac_counts,
-        "color_counts": color_counts
+        "color_counts": color_counts,
+        "streaks": streak_index.to_dict(),
+        "gap_stats": gap_stats,
+        # 间隔分布对应的数据库快照，供预测端尾窗模式校验是否可直接复用
+        "gap_stats_source": {"total_records": total_records, "latest_period": records[0]['period']}
     }
     with open(chart_file, 'w', encoding='utf-8') as f:
         json.dump(chart_data, f, ensure_ascii=False, indent=2)
@@ -2,7 +2,14 @@ import json
 import sqlite3
 import datetime
 from collections import defaultdict, deque
+import argparse
 import numpy as np
+from analyzer import StreakIndex, RELATIONS_CHONG, WUXING_SHENG
+
+# 资金热力模型的因子拆分，顺序即消融报告的行顺序
+HEAT_FACTORS = ['死穴凶数', '极数崇拜', '生肖正冲', '五行相生', '生日效应', '吉利号',
+                '本命年', '邻号追热', '倍投雪球', '追涨杀跌', '宏观偏态', '波色断龙']
+BASE_HEAT = 100.0
 
 def get_current_zodiac_map(ref_year):
     zodiac_order = ['鼠', '牛', '虎', '兔', '龍', '蛇', '馬', '羊', '猴', '雞', '狗', '豬']
@@ -52,6 +59,102 @@ def get_records_from_db(db_path='lottery.db'):
         })
     return records
 
+def heat_factor_contributions(history_slice, streak_index):
+    """计算一期的资金热力分解：返回 (len(HEAT_FACTORS), 49) 矩阵，第 k 行是第 k 个因子给 1~49 号加的热度。
+
+    总热度 = BASE_HEAT + 各行之和。遗漏、近10期频次、大小单双偏态、游程等逐期状态只算一次，
+    全部因子(以及消融时的各个变体)共享。
+    """
+    latest = history_slice[-1]
+    ref_year = int(latest['date'][:4])
+
+    ZODIAC_MAP = get_current_zodiac_map(ref_year)
+    NUM_TO_ZODIAC = {n: z for z, nums in ZODIAC_MAP.items() for n in nums}
+    WUXING_MAP = get_current_wuxing_map(ref_year)
+    NUM_TO_WUXING = {n: w for w, nums in WUXING_MAP.items() for n in nums}
+    COLOR_MAP = get_color_map()
+    NUM_TO_COLOR = {n: c for c, nums in COLOR_MAP.items() for n in nums}
+
+    current_year_zodiac = NUM_TO_ZODIAC.get(1, '鼠')
+
+    miss_tracker = {n: 0 for n in range(1, 50)}
+    freq_10 = {n: 0 for n in range(1, 50)}
+    recent_30_queue = deque(maxlen=30)
+
+    for j in range(len(history_slice) - 1):
+        curr_nums = set(history_slice[j]['numbers'] + [history_slice[j]['special']])
+        recent_30_queue.append(curr_nums)
+        for n in range(1, 50):
+            if n in curr_nums: miss_tracker[n] = 0
+            else: miss_tracker[n] += 1
+
+    for past_nums in list(recent_30_queue)[-10:]:
+        for n in past_nums: freq_10[n] += 1
+
+    latest_nums = set(latest['numbers'] + [latest['special']])
+    for n in range(1, 50):
+        if n in latest_nums: miss_tracker[n] = 0
+        else: miss_tracker[n] += 1
+
+    reversed_hist = history_slice[::-1]
+    recent_5_big = sum(1 for r in reversed_hist[:5] for n in r['numbers']+[r['special']] if n >= 25)
+    recent_5_odd = sum(1 for r in reversed_hist[:5] for n in r['numbers']+[r['special']] if n % 2 != 0)
+    big_heavy_bet = recent_5_big > 20
+    small_heavy_bet = recent_5_big < 15
+    odd_heavy_bet = recent_5_odd > 20
+    even_heavy_bet = recent_5_odd < 15
+
+    streak_color, streak_len = streak_index.current_streak('color')
+
+    last_special = latest['special']
+    last_special_zodiac = latest['special_zodiac']
+    last_special_wuxing = NUM_TO_WUXING.get(last_special, '金')
+
+    nums = np.arange(1, 50)
+    miss = np.array([miss_tracker[n] for n in nums], dtype=np.float64)
+    freq = np.array([freq_10[n] for n in nums])
+    zodiacs = np.array([NUM_TO_ZODIAC.get(n, '') for n in nums])
+    wuxings = np.array([NUM_TO_WUXING.get(n, '') for n in nums])
+    colors = np.array([NUM_TO_COLOR.get(n, '绿') for n in nums])
+    is_big = nums >= 25
+    is_odd = nums % 2 != 0
+
+    factors = np.zeros((len(HEAT_FACTORS), 49))
+    # --- 【中式玄学与迷信维度】 ---
+    # 死穴凶数回避：4, 14, 24, 34, 44 散户基本不碰，资金抽离
+    factors[0] = np.where(nums % 10 == 4, -40.0, 0.0)
+    # 极数崇拜与天机号：资金沉淀
+    factors[1] = np.where(np.isin(nums, [1, 49]), 60.0, 0.0)
+    # 生肖正冲恐惧：散户觉得这期绝不可能开
+    factors[2] = np.where(zodiacs == RELATIONS_CHONG.get(last_special_zodiac, ''), -35.0, 0.0)
+    # 五行相生追捧：木生火，散户狂追火
+    factors[3] = np.where(wuxings == WUXING_SHENG.get(last_special_wuxing, ''), 45.0, 0.0)
+
+    # --- 【传统行为心理维度】 ---
+    factors[4] = np.where(nums <= 31, 30.0, 0.0)
+    factors[5] = np.where(np.isin(nums % 10, [6, 8, 9]) | np.isin(nums, [11, 22, 33]), 40.0, 0.0)
+    factors[6] = np.where(zodiacs == current_year_zodiac, 50.0, 0.0)
+    factors[7] = np.where(np.abs(nums - last_special) == 1, 45.0, 0.0)
+
+    # 极限倍投雪球 (遗漏)
+    factors[8] = np.where(miss >= 8, 20.0 + (miss - 8) * 15.0, 0.0) + np.where(miss >= 18, 200.0, 0.0)
+    # 追涨杀跌
+    factors[9] = np.where(miss == 0, 50.0, 0.0) + np.where(freq >= 3, 80.0, 0.0)
+    # 宏观偏态
+    skew_bets = [big_heavy_bet & ~is_big, small_heavy_bet & is_big, odd_heavy_bet & ~is_odd, even_heavy_bet & is_odd]
+    factors[10] = 80.0 * np.sum(skew_bets, axis=0)
+    # 波色断龙
+    factors[11] = np.where((streak_len >= 3) & (colors != streak_color), 120.0, 0.0)
+    return factors
+
+def rank_by_heat(heat):
+    """按安全分数 (10000 - 资金热度) 从高到低排出号码；同分时号码小者在前，与 sorted(reverse=True) 一致。
+
+    heat 可为 (49,) 或 (变体数, 49)，返回同形状的号码矩阵。
+    """
+    scores = 10000.0 - heat
+    return np.argsort(-scores, axis=-1, kind='stable') + 1
+
 def run_metaphysics_heatmap_backtest(test_window=50, db_file='lottery.db'):
     records = get_records_from_db(db_file)
     total_records = len(records)
@@ -64,12 +167,15 @@ def run_metaphysics_heatmap_backtest(test_window=50, db_file='lottery.db'):
     print(f"核心逻辑：叠加谐音避讳、生肖相冲、五行相生等中式玄学因素，锁定庄家终极盲区。")
     print("-" * 75)
 
-    RELATIONS_CHONG = {'鼠':'馬', '馬':'鼠', '牛':'羊', '羊':'牛', '虎':'猴', '猴':'虎', '兔':'雞', '雞':'兔', '龍':'狗', '狗':'龍', '蛇':'豬', '豬':'蛇'}
-    WUXING_SHENG = {'金':'水', '水':'木', '木':'火', '火':'土', '土':'金'}
-
     top1_hit_count = 0
     top6_hit_count = 0
     normal_hit_rates = []
+    periods = []
+    top1_hits = []
+    top6_hits = []
+
+    # 游程索引只构建一次，之后每步回测追加一期
+    streak_index = StreakIndex(records[:total_records - test_window])
 
     for i in range(total_records - test_window, total_records):
         history_slice = records[:i]
@@ -78,151 +184,306 @@ def run_metaphysics_heatmap_backtest(test_window=50, db_file='lottery.db'):
         actual_special = target_record['special']
         actual_normals = set(target_record['numbers'])
         
-        latest = history_slice[-1]
-        ref_year = int(latest['date'][:4])
-        
-        ZODIAC_MAP = get_current_zodiac_map(ref_year)
-        NUM_TO_ZODIAC = {n: z for z, nums in ZODIAC_MAP.items() for n in nums}
-        WUXING_MAP = get_current_wuxing_map(ref_year)
-        NUM_TO_WUXING = {n: w for w, nums in WUXING_MAP.items() for n in nums}
-        COLOR_MAP = get_color_map()
-        NUM_TO_COLOR = {n: c for c, nums in COLOR_MAP.items() for n in nums}
-        
-        current_year_zodiac = NUM_TO_ZODIAC.get(1, '鼠')
-
-        miss_tracker = {n: 0 for n in range(1, 50)}
-        freq_10 = {n: 0 for n in range(1, 50)}
-        recent_30_queue = deque(maxlen=30)
-        
-        for j in range(len(history_slice) - 1):
-            curr_nums = set(history_slice[j]['numbers'] + [history_slice[j]['special']])
-            recent_30_queue.append(curr_nums)
-            for n in range(1, 50):
-                if n in curr_nums: miss_tracker[n] = 0
-                else: miss_tracker[n] += 1
-
-        for past_nums in list(recent_30_queue)[-10:]:
-            for n in past_nums: freq_10[n] += 1
-
-        latest_nums = set(latest['numbers'] + [latest['special']])
-        for n in range(1, 50):
-            if n in latest_nums: miss_tracker[n] = 0
-            else: miss_tracker[n] += 1
-
-        reversed_hist = history_slice[::-1]
-        recent_5_big = sum(1 for r in reversed_hist[:5] for n in r['numbers']+[r['special']] if n >= 25)
-        recent_5_odd = sum(1 for r in reversed_hist[:5] for n in r['numbers']+[r['special']] if n % 2 != 0)
-        big_heavy_bet = recent_5_big > 20
-        small_heavy_bet = recent_5_big < 15
-        odd_heavy_bet = recent_5_odd > 20
-        even_heavy_bet = recent_5_odd < 15
-
-        color_streak = []
-        for r in reversed_hist:
-            c = NUM_TO_COLOR.get(r['special'], '绿')
-            if not color_streak or color_streak[-1] == c:
-                color_streak.append(c)
-            else:
-                break
-        streak_len = len(color_streak)
-        streak_color = color_streak[0] if color_streak else None
-
-        last_special = latest['special']
-        last_special_zodiac = latest['special_zodiac']
-        last_special_wuxing = NUM_TO_WUXING.get(last_special, '金')
-
         # ==========================================
-        # 🧨 核心模块：玄学+心理 资金热力图
+        # 🧨 核心模块：玄学+心理 资金热力图 (按因子拆分后求和)
+        # 🛡️ 庄家收割打分：安全分数 = 10000 - 资金热度，锁定庄家低赔付玄学盲区
         # ==========================================
-        capital_heat = {}
-        for n in range(1, 50):
-            heat = 100.0  
-            
-            # --- 【中式玄学与迷信维度】 ---
-            
-            # 1. 死穴凶数回避 (散户极度嫌弃) -> 资金抽离
-            if n % 10 == 4:
-                heat -= 40.0  # 4, 14, 24, 34, 44 散户基本不碰，庄家极度安全
-                
-            # 2. 极数崇拜与天机号 -> 资金沉淀
-            if n in [1, 49]:
-                heat += 60.0
-                
-            # 3. 生肖正冲恐惧 -> 散户不敢买，资金抽离
-            curr_zodiac = NUM_TO_ZODIAC.get(n, '')
-            if curr_zodiac == RELATIONS_CHONG.get(last_special_zodiac, ''):
-                heat -= 35.0  # 散户觉得这期绝不可能开，庄家反向杀出
-                
-            # 4. 五行相生追捧 -> 散户重注，资金暴涨
-            curr_wuxing = NUM_TO_WUXING.get(n, '')
-            if curr_wuxing == WUXING_SHENG.get(last_special_wuxing, ''):
-                heat += 45.0  # 木生火，散户狂追火
-
-            # --- 【传统行为心理维度】 ---
-            if n <= 31: heat += 30.0 # 生日
-            if n % 10 in [6, 8, 9] or n in [11, 22, 33]: heat += 40.0 # 吉利号
-            if curr_zodiac == current_year_zodiac: heat += 50.0 # 本命年
-            if n == last_special - 1 or n == last_special + 1: heat += 45.0 # 邻号
-            
-            # 极限倍投雪球 (遗漏)
-            if miss_tracker[n] >= 8: heat += 20.0 + (miss_tracker[n] - 8) * 15.0
-            if miss_tracker[n] >= 18: heat += 200.0 
-
-            # 追涨杀跌
-            if miss_tracker[n] == 0: heat += 50.0 
-            if freq_10[n] >= 3: heat += 80.0      
-                
-            # 宏观偏态
-            is_big = n >= 25
-            is_odd = n % 2 != 0
-            if big_heavy_bet and not is_big: heat += 80.0
-            if small_heavy_bet and is_big: heat += 80.0
-            if odd_heavy_bet and not is_odd: heat += 80.0
-            if even_heavy_bet and is_odd: heat += 80.0
-                
-            # 波色断龙
-            color = NUM_TO_COLOR.get(n, '绿')
-            if streak_len >= 3 and color != streak_color:
-                heat += 120.0  
-
-            capital_heat[n] = heat
-
-        # ==========================================
-        # 🛡️ 庄家收割打分：安全分数 = 10000 - 资金热度
-        # ==========================================
-        scores = {}
-        for n in range(1, 50):
-            scores[n] = 10000.0 - capital_heat[n]
-
-        # 锁定庄家低赔付玄学盲区
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        top6_specials = [item[0] for item in sorted_scores[:6]]
+        factors = heat_factor_contributions(history_slice, streak_index)
+        ranking = rank_by_heat(BASE_HEAT + factors.sum(axis=0)).tolist()
+        top6_specials = ranking[:6]
         primary_special = top6_specials[0]
-        
-        normal_candidates = []
-        for num, _ in sorted_scores:
-            if num == primary_special: continue
-            normal_candidates.append(num)
-            if len(normal_candidates) >= 6: break
+        normal_candidates = ranking[1:7]
 
         is_top1_hit = (actual_special == primary_special)
         is_top6_hit = (actual_special in top6_specials)
         normal_hit_count = len(set(normal_candidates).intersection(actual_normals))
         
+        streak_index.extend(target_record)
+
         if is_top1_hit: top1_hit_count += 1
         if is_top6_hit: top6_hit_count += 1
         normal_hit_rates.append(normal_hit_count)
+        periods.append(target_period)
+        top1_hits.append(is_top1_hit)
+        top6_hits.append(is_top6_hit)
 
         hit_status = "🎯 TOP1 玄学斩杀!" if is_top1_hit else ("✅ TOP6 完美避险" if is_top6_hit else "❌ 庄家常规派彩")
         print(f"| 期数: {target_period} | 真实特码: {actual_special:02d} | 玄学杀猪 Top6: {[f'{n:02d}' for n in top6_specials]} | 状态: {hit_status}")
 
     print("-" * 75)
-    print("📊 [玄学迷信 + 杀猪盘资金热力模型 - 50期回测总结]")
+    print(f"📊 [玄学迷信 + 杀猪盘资金热力模型 - {test_window}期回测总结]")
     print(f"测试样本量: {test_window} 期")
     print(f"绝对盲区狙击命中率 (Top 1): {top1_hit_count} / {test_window}  ({(top1_hit_count/test_window)*100:.2f}%)")
     print(f"低赔付矩阵防守成功率 (Top 6): {top6_hit_count} / {test_window}  ({(top6_hit_count/test_window)*100:.2f}%)")
     print(f"正码防守平均散户避险数: {np.mean(normal_hit_rates):.2f} / 6")
     print("-" * 75)
 
+    return {
+        "periods": periods,
+        "top1_hits": np.array(top1_hits, dtype=bool),
+        "top6_hits": np.array(top6_hits, dtype=bool),
+        "normal_hits": np.array(normal_hit_rates, dtype=np.int64)
+    }
+
+def run_ablation_backtest(test_window=50, db_file='lottery.db'):
+    """因子消融归因：一次逐期回测同时评估完整模型与每个“去掉一个因子”的变体。
+
+    各变体共享同一份逐期状态与因子分解，只在热度求和时少加一行；
+    边际贡献 = 完整模型指标 - 去掉该因子后的指标，正值说明该因子在回测窗口内确实有用。
+    """
+    records = get_records_from_db(db_file)
+    total_records = len(records)
+
+    if total_records < test_window + 50:
+        print("错误：数据量不足以支撑回测窗口。")
+        return
+
+    print(f"\n[{datetime.datetime.now().strftime('%H:%M:%S')}] 开启【因子消融归因】：完整模型 + {len(HEAT_FACTORS)} 个去因子变体，单次回测 {test_window} 期...")
+
+    n_variants = len(HEAT_FACTORS) + 1
+    top1_hits = np.zeros(n_variants, dtype=np.int64)
+    top6_hits = np.zeros(n_variants, dtype=np.int64)
+    normal_hits = np.zeros(n_variants, dtype=np.int64)
+
+    streak_index = StreakIndex(records[:total_records - test_window])
+    for i in range(total_records - test_window, total_records):
+        target_record = records[i]
+        actual_special = target_record['special']
+
+        factors = heat_factor_contributions(records[:i], streak_index)
+        full_heat = BASE_HEAT + factors.sum(axis=0)
+        # 第 0 行为完整模型，第 k 行去掉第 k 个因子
+        ranking = rank_by_heat(np.vstack([full_heat, full_heat - factors]))
+
+        top1_hits += ranking[:, 0] == actual_special
+        top6_hits += (ranking[:, :6] == actual_special).any(axis=1)
+        normal_hits += np.isin(ranking[:, 1:7], target_record['numbers']).sum(axis=1)
+        streak_index.extend(target_record)
+
+    top1_rate = top1_hits / test_window
+    top6_rate = top6_hits / test_window
+    normal_mean = normal_hits / test_window
+    result = {
+        "test_window": test_window,
+        "full": {"top1_rate": float(top1_rate[0]), "top6_rate": float(top6_rate[0]), "normal_mean": float(normal_mean[0])},
+        "factors": {
+            name: {
+                "top1_rate": float(top1_rate[k + 1]),
+                "top6_rate": float(top6_rate[k + 1]),
+                "normal_mean": float(normal_mean[k + 1]),
+                "delta_top1": float(top1_rate[0] - top1_rate[k + 1]),
+                "delta_top6": float(top6_rate[0] - top6_rate[k + 1]),
+                "delta_normal": float(normal_mean[0] - normal_mean[k + 1])
+            }
+            for k, name in enumerate(HEAT_FACTORS)
+        }
+    }
+    print_ablation_report(result)
+    return result
+
+def print_ablation_report(result):
+    full = result['full']
+    print("-" * 75)
+    print(f"🧪 [因子边际贡献表] 回测 {result['test_window']} 期 | 完整模型 Top1 {full['top1_rate']:.2%} | Top6 {full['top6_rate']:.2%} | 正码 {full['normal_mean']:.2f} / 6")
+    print("(Δ = 完整模型 - 去掉该因子；正值代表该因子提升了命中，负值代表拖累)")
+    print(f"{'因子':<10}{'去掉后Top1':>12}{'去掉后Top6':>12}{'去掉后正码':>12}{'ΔTop1':>10}{'ΔTop6':>10}{'Δ正码':>10}")
+    for name, r in result['factors'].items():
+        print(f"{name:<10}{r['top1_rate']:>12.2%}{r['top6_rate']:>12.2%}{r['normal_mean']:>12.2f}"
+              f"{r['delta_top1']:>+10.2%}{r['delta_top6']:>+10.2%}{r['delta_normal']:>+10.2f}")
+    print("-" * 75)
+
+# ==========================================
+# 💰 资金曲线模拟：按 Top6 特码每期等额分注
+# ==========================================
+def default_staking_schemes():
+    """默认注码方案网格：平注 / 比例注 / 封顶倍投"""
+    schemes = []
+    for stake in [1, 2, 5, 10, 20, 30, 50, 80, 100, 200]:
+        schemes.append({"name": f"平注-{stake}", "type": "flat", "stake": float(stake)})
+    for fraction in np.round(np.linspace(0.005, 0.2, 40), 4):
+        schemes.append({"name": f"比例-{fraction:.2%}", "type": "proportional", "fraction": float(fraction)})
+    for base in [1, 2, 5, 10, 20]:
+        for multiplier in [1.2, 1.5, 2.0, 2.5, 3.0]:
+            for cap in [2, 4, 8, 16, 32, 64]:
+                schemes.append({"name": f"倍投-{base}x{multiplier}封顶{cap}", "type": "progressive",
+                                "base": float(base), "multiplier": multiplier, "cap": float(cap)})
+    return schemes
+
+def loss_runs_before(hits):
+    """每期下注前已连续未中的期数 (沿最后一维计算，首期为 0)"""
+    t = np.arange(hits.shape[-1])
+    last_hit = np.maximum.accumulate(np.where(hits, t, -1), axis=-1)
+    runs = np.zeros(hits.shape, dtype=np.int64)
+    runs[..., 1:] = (t - last_hit)[..., :-1]
+    return runs
+
+def _capped_bankroll(stakes, unit_return, initial_bankroll, floor):
+    """注额不得超过下注前的资金：逐次找出每条曲线破产前首个超额的期，把该期注额截为当期资金后重算。
+
+    截断后这一注要么输光直接破产，要么派彩使资金回升，因此循环次数只等于单条曲线上“截断后命中”的次数。
+    返回 (截断后的注额, 资金曲线)
+    """
+    stakes = np.array(stakes, dtype=np.float64)
+    while True:
+        bankroll = initial_bankroll + np.cumsum(stakes * unit_return, axis=-1)
+        previous = np.concatenate([np.full(bankroll.shape[:-1] + (1,), initial_bankroll), bankroll[..., :-1]], axis=-1)
+        alive = ~np.logical_or.accumulate(previous <= floor, axis=-1)
+        over = alive & (stakes > previous)
+        rows = np.nonzero(over.any(axis=-1))
+        if not len(rows[0]):
+            return stakes, bankroll
+        first = np.argmax(over[rows], axis=-1)
+        stakes[rows + (first,)] = previous[rows + (first,)]
+
+def _simulate_family(kind, schemes, hits, odds, initial_bankroll, ruin_level):
+    """同一类方案一次性向量化：hits 形状 (路径数, 期数)，返回 (方案数, 路径数, 期数) 的注额与资金曲线。
+
+    平注与倍投的注额以下注前资金为上限 (不允许透支)；比例注天然不会超额。
+    """
+    # 6 个号码等额分注，命中时其中 1 注按 odds 派彩(含本金)
+    unit_return = np.where(hits, odds / 6.0 - 1.0, -1.0)[None]
+    floor = initial_bankroll * ruin_level
+
+    if kind == 'flat':
+        stake = np.array([sc['stake'] for sc in schemes])[:, None, None]
+        stakes = np.broadcast_to(stake, (len(schemes),) + hits.shape)
+        stakes, bankroll = _capped_bankroll(stakes, unit_return, initial_bankroll, floor)
+    elif kind == 'proportional':
+        fraction = np.array([sc['fraction'] for sc in schemes])[:, None, None]
+        bankroll = initial_bankroll * np.cumprod(1.0 + fraction * unit_return, axis=-1)
+        previous = np.concatenate([np.full(bankroll.shape[:-1] + (1,), initial_bankroll), bankroll[..., :-1]], axis=-1)
+        stakes = fraction * previous
+    elif kind == 'progressive':
+        base = np.array([sc['base'] for sc in schemes])[:, None, None]
+        multiplier = np.array([sc['multiplier'] for sc in schemes])[:, None, None]
+        cap = np.array([sc['cap'] for sc in schemes])[:, None, None]
+        # 连败层级超过 64 时倍数早已触顶，截断以避免浮点溢出
+        level = np.minimum(loss_runs_before(hits), 64)[None]
+        stakes = base * np.minimum(multiplier ** level, cap)
+        stakes, bankroll = _capped_bankroll(stakes, unit_return, initial_bankroll, floor)
+    else:
+        raise ValueError(f"未知的注码方案类型: {kind}")
+    return stakes, bankroll
+
+def _summarize_paths(stakes, bankroll, initial_bankroll, ruin_level):
+    """破产后资金冻结不再下注，返回 (ROI, 最大回撤, 期末资金, 是否破产)"""
+    ruined = np.logical_or.accumulate(bankroll <= initial_bankroll * ruin_level, axis=-1)
+    betting = np.ones(ruined.shape, dtype=bool)
+    betting[..., 1:] = ~ruined[..., :-1]
+
+    first_ruin = np.argmax(ruined, axis=-1)[..., None]
+    bankroll = np.where(ruined, np.take_along_axis(bankroll, first_ruin, axis=-1), bankroll)
+
+    staked = (stakes * betting).sum(axis=-1)
+    final = bankroll[..., -1]
+    roi = np.divide(final - initial_bankroll, staked, out=np.zeros(final.shape), where=staked > 0)
+    peak = np.maximum.accumulate(np.maximum(bankroll, initial_bankroll), axis=-1)
+    max_drawdown = ((peak - bankroll) / peak).max(axis=-1)
+    return roi, max_drawdown, final, ruined[..., -1]
+
+def _ruin_flags(kind, schemes, hits, odds, initial_bankroll, ruin_level, max_cells):
+    """破产判定只需资金曲线的最低点：注额中的线性倍数(平注额/倍投基数)可提到 cumsum 之外，
+    因此只对互不相同的曲线形状各做一次 (路径数, 期数) 累加。返回 (方案数, 路径数) 的布尔矩阵。
+
+    注额封顶只在“资金不足一注且这一注命中”时改变结局 (输光的话封顶与否都破产)。
+    封顶后的资金在破产前始终不高于不封顶的资金，所以不封顶已破产的路径必然破产；
+    只有不封顶从未破产、却出现过上述命中的少数路径需要按封顶规则重算。
+    """
+    unit_return = np.where(hits, odds / 6.0 - 1.0, -1.0)
+    floor = initial_bankroll * ruin_level
+
+    if kind == 'proportional':
+        fraction = np.array([sc['fraction'] for sc in schemes])
+        flags = []
+        chunk = max(1, max_cells // unit_return.size)
+        for start in range(0, len(fraction), chunk):
+            f = fraction[start:start + chunk, None, None]
+            low = np.cumsum(np.log1p(f * unit_return[None]), axis=-1).min(axis=-1)
+            flags.append(low <= np.log(ruin_level))
+        return np.concatenate(flags, axis=0)
+
+    flags = np.zeros((len(schemes), len(hits)), dtype=bool)
+    shapes = {}
+    if kind == 'flat':
+        shapes[None] = [(i, sc['stake']) for i, sc in enumerate(schemes)]
+    else:
+        level = np.minimum(loss_runs_before(hits), 64)
+        levels = np.arange(65)
+        for i, sc in enumerate(schemes):
+            shapes.setdefault((sc['multiplier'], sc['cap']), []).append((i, sc['base']))
+
+    for shape_key, members in shapes.items():
+        if shape_key is None:
+            unit_stakes = np.ones(hits.shape)
+        else:
+            multiplier, cap = shape_key
+            # 倍数只取决于连败层级，查表代替逐元素求幂
+            unit_stakes = np.minimum(multiplier ** levels, cap)[level]
+        curve = np.cumsum(unit_stakes * unit_return, axis=-1)
+        low = curve.min(axis=-1)
+        # 命中期 “下注前累计盈亏 - 单注倍数” 的最低点 (与基数无关)：
+        # 某个 base 下它低于 -initial / base，说明存在资金不足一注却命中的期
+        hit_margin = np.where(hits, curve - unit_stakes * (odds / 6.0), np.inf).min(axis=-1)
+        for i, base in members:
+            flags[i] = initial_bankroll + base * low <= floor
+            # 阈值放宽一点得到候选超集，候选路径再按封顶规则精确重算
+            capped_win = ~flags[i] & (hit_margin < -initial_bankroll / base + 1e-6)
+            if capped_win.any():
+                _, bankroll = _capped_bankroll(base * unit_stakes[capped_win], unit_return[capped_win], initial_bankroll, floor)
+                flags[i, capped_win] = (bankroll <= floor).any(axis=-1)
+    return flags
+
+def simulate_bankroll(hits, schemes=None, odds=47.0, initial_bankroll=1000.0, ruin_level=0.05,
+                      n_paths=200, seed=42, max_cells=4_000_000):
+    """在逐期命中向量上批量评估注码方案。
+
+    ROI / 最大回撤按真实回测路径计算；破产概率由 n_paths 条有放回重抽样的命中序列估计。
+    单注不得超过下注前资金 (不允许透支)，资金不足一注时全部押上。
+    odds 为单注命中的派彩倍数(含本金)，资金跌破 initial_bankroll * ruin_level 视为破产。
+    """
+    hits = np.asarray(hits, dtype=bool)
+    schemes = schemes or default_staking_schemes()
+    rng = np.random.default_rng(seed)
+    boot_hits = rng.choice(hits, size=(n_paths, len(hits)), replace=True)
+
+    results = []
+    for kind in ('flat', 'proportional', 'progressive'):
+        family = [sc for sc in schemes if sc['type'] == kind]
+        if not family:
+            continue
+        stakes, bankroll = _simulate_family(kind, family, hits[None], odds, initial_bankroll, ruin_level)
+        roi, max_drawdown, final, ruined = _summarize_paths(stakes, bankroll, initial_bankroll, ruin_level)
+        boot_ruined = _ruin_flags(kind, family, boot_hits, odds, initial_bankroll, ruin_level, max_cells)
+
+        for i, sc in enumerate(family):
+            results.append({
+                "name": sc['name'],
+                "type": kind,
+                "roi": float(roi[i, 0]),
+                "max_drawdown": float(max_drawdown[i, 0]),
+                "final_bankroll": float(final[i, 0]),
+                "ruined": bool(ruined[i, 0]),
+                "ruin_probability": float(boot_ruined[i].mean())
+            })
+    return results
+
+def print_bankroll_report(results, top=10):
+    ranked = sorted(results, key=lambda x: x['roi'], reverse=True)
+    print(f"💰 [注码方案资金模拟] 共评估 {len(results)} 套方案，按 ROI 排序前 {top} 名：")
+    print(f"{'方案':<24}{'ROI':>10}{'最大回撤':>10}{'期末资金':>12}{'破产概率':>10}")
+    for r in ranked[:top]:
+        print(f"{r['name']:<24}{r['roi']:>10.2%}{r['max_drawdown']:>10.2%}{r['final_bankroll']:>12.2f}{r['ruin_probability']:>10.2%}")
+    print("-" * 75)
+
 if __name__ == '__main__':
-    run_metaphysics_heatmap_backtest(test_window=50)
+    parser = argparse.ArgumentParser(description='资金热力模型逐期回测')
+    parser.add_argument('--window', type=int, default=50, help='回测期数')
+    parser.add_argument('--ablation', action='store_true', help='单次回测内评估每个去因子变体，输出因子边际贡献表')
+    args = parser.parse_args()
+
+    if args.ablation:
+        run_ablation_backtest(test_window=args.window)
+    else:
+        result = run_metaphysics_heatmap_backtest(test_window=args.window)
+        if result:
+            print_bankroll_report(simulate_bankroll(result['top6_hits']))
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import pandas as pd
+
+EXPORT_DIR = 'history_parquet'
+
+# 直接在 SQLite 里用 JSON1 把号码数组拆成独立的整数列，避免 Python 层逐行 json.loads
+EXPORT_SQL = '''
+    SELECT period, open_date, raw_time,
+           json_extract(numbers, '$[0]') AS n1, json_extract(numbers, '$[1]') AS n2,
+           json_extract(numbers, '$[2]') AS n3, json_extract(numbers, '$[3]') AS n4,
+           json_extract(numbers, '$[4]') AS n5, json_extract(numbers, '$[5]') AS n6,
+           special,
+           json_extract(zodiacs, '$[0]') AS z1, json_extract(zodiacs, '$[1]') AS z2,
+           json_extract(zodiacs, '$[2]') AS z3, json_extract(zodiacs, '$[3]') AS z4,
+           json_extract(zodiacs, '$[4]') AS z5, json_extract(zodiacs, '$[5]') AS z6,
+           special_zodiac
+    FROM history
+    WHERE substr(open_date, 1, 4) = ?
+    ORDER BY period ASC
+'''
+NUMBER_COLUMNS = ['n1', 'n2', 'n3', 'n4', 'n5', 'n6', 'special']
+
+def partition_path(export_dir, year):
+    return os.path.join(export_dir, f'year={year}', 'part-0.parquet')
+
+def get_year_counts(conn):
+    """按年份统计数据库行数，用于判断哪些分区需要重写"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT substr(open_date, 1, 4), COUNT(*) FROM history GROUP BY 1 ORDER BY 1")
+    return {year: count for year, count in cursor.fetchall()}
+
+def get_partition_rows(path):
+    """读取已有分区的行数(只读 Parquet 元数据，不加载数据)"""
+    import pyarrow.parquet as pq
+    if not os.path.exists(path):
+        return -1
+    try:
+        return pq.read_metadata(path).num_rows
+    except Exception:
+        return -1
+
+def export_history_parquet(db_path='lottery.db', export_dir=EXPORT_DIR, force=False):
+    """把 history 表导出为按年份分区的 Parquet 列存数据集。
+
+    号码拆分为 n1..n6 + special 七个 int8 列。每日增量更新时只重写行数发生变化的年份分区
+    (通常只有当年)，历史年份分区保持不动。
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("⚠️ 未安装 pyarrow，跳过 Parquet 列存导出。")
+        return []
+
+    conn = sqlite3.connect(db_path)
+    year_counts = get_year_counts(conn)
+
+    written = []
+    for year, count in year_counts.items():
+        path = partition_path(export_dir, year)
+        if not force and get_partition_rows(path) == count:
+            continue
+
+        df = pd.read_sql_query(EXPORT_SQL, conn, params=(year,))
+        df[NUMBER_COLUMNS] = df[NUMBER_COLUMNS].astype('int8')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        df.to_parquet(tmp_path, engine='pyarrow', index=False)
+        os.replace(tmp_path, path)
+        written.append(year)
+        print(f"    - {year} 年分区：写入 {len(df)} 条 -> {path}")
+    conn.close()
+
+    if not written:
+        print("    - 所有年份分区均已是最新，无需重写。")
+    print(f"[成功] Parquet 列存导出完毕：共 {len(year_counts)} 个年份分区，本次重写 {len(written)} 个。")
+    return written
+
+def load_history_parquet(export_dir=EXPORT_DIR, columns=None):
+    """一次向量化读取全部分区，返回按期号升序排列的 DataFrame (含 year 分区列)"""
+    df = pd.read_parquet(export_dir, engine='pyarrow', columns=columns)
+    if 'period' in df.columns:
+        df = df.sort_values('period', kind='stable').reset_index(drop=True)
+    return df
+
+if __name__ == '__main__':
+    print(">>> 正在导出开奖历史 Parquet 列存数据集...")
+    export_history_parquet()
@@ -23,63 +23,74 @@ def init_db(db_path='lottery.db'):
     conn.commit()
     return conn
 
-def fetch_lottery_data_api(db_path='lottery.db'):
+# 开奖接口地址(按年份拼接)。可通过环境变量指向本地替身数据源，方便离线联调
+API_BASE_URL = os.environ.get('LOTTERY_API_BASE', 'https://history.macaumarksix.com/history/macaujc2/y')
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+}
+
+def fetch_year_items(year, base_url=None, session=None, timeout=10):
+    """拉取指定年份的开奖列表，接口异常时抛出 ValueError"""
+    url = f"{(base_url or API_BASE_URL).rstrip('/')}/{year}"
+    http = session or requests
+    response = http.get(url, headers=HEADERS, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if data.get('code') == 200 and data.get('result'):
+        return data.get('data', [])
+    raise ValueError(f"数据获取失败: {data.get('message')}")
+
+def save_items(cursor, items):
+    """把接口返回的开奖记录写入 history 表，返回 (新增数, 重复数)"""
+    added_count = 0
+    duplicate_count = 0
+    for item in items:
+        open_time = item['openTime']
+        open_date = open_time.split(' ')[0]
+        period = item['expect']
+        
+        codes = [int(x) for x in item['openCode'].split(',')]
+        zodiacs = item['zodiac'].split(',')
+        
+        # SQLite 原生防呆去重：INSERT OR IGNORE
+        try:
+            cursor.execute('''
+                INSERT INTO history (period, open_date, numbers, zodiacs, special, special_zodiac, raw_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                period, 
+                open_date, 
+                json.dumps(codes[:6], ensure_ascii=False), 
+                json.dumps(zodiacs[:6], ensure_ascii=False), 
+                codes[6], 
+                zodiacs[6],
+                open_time
+            ))
+            added_count += 1
+        except sqlite3.IntegrityError:
+            # 触发了 UNIQUE 约束，说明数据已存在，直接跳过
+            duplicate_count += 1
+    return added_count, duplicate_count
+
+def fetch_lottery_data_api(db_path='lottery.db', base_url=None):
     conn = init_db(db_path)
     cursor = conn.cursor()
     
-    current_year = datetime.datetime.now().year
+    # LOTTERY_FETCH_YEAR 可覆盖“当前年份”，用于离线回放历史日期
+    current_year = int(os.environ.get('LOTTERY_FETCH_YEAR', datetime.datetime.now().year))
     years_to_fetch = [current_year, current_year - 1] 
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-    }
-    
     for year in years_to_fetch:
-        url = f"https://history.macaumarksix.com/history/macaujc2/y/{year}"
         print(f">>> 正在通过 API 拉取 {year} 年开奖数据(SQLite安全模式)...")
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status() 
-            data = response.json()
-            
-            if data.get('code') == 200 and data.get('result'):
-                items = data.get('data', [])
-                added_count = 0
-                duplicate_count = 0
-                
-                for item in items:
-                    open_time = item['openTime']
-                    open_date = open_time.split(' ')[0]
-                    period = item['expect']
-                    
-                    codes = [int(x) for x in item['openCode'].split(',')]
-                    zodiacs = item['zodiac'].split(',')
-                    
-                    # SQLite 原生防呆去重：INSERT OR IGNORE
-                    try:
-                        cursor.execute('''
-                            INSERT INTO history (period, open_date, numbers, zodiacs, special, special_zodiac, raw_time)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            period, 
-                            open_date, 
-                            json.dumps(codes[:6], ensure_ascii=False), 
-                            json.dumps(zodiacs[:6], ensure_ascii=False), 
-                            codes[6], 
-                            zodiacs[6],
-                            open_time
-                        ))
-                        added_count += 1
-                    except sqlite3.IntegrityError:
-                        # 触发了 UNIQUE 约束，说明数据已存在，直接跳过
-                        duplicate_count += 1
-                        
-                conn.commit()
-                print(f"    - {year}年接口：成功新增入库 {added_count} 条，拦截重复数据 {duplicate_count} 条")
-            else:
-                print(f"    - {year}年接口：数据获取失败: {data.get('message')}")
-                
+            items = fetch_year_items(year, base_url=base_url)
+            added_count, duplicate_count = save_items(cursor, items)
+            conn.commit()
+            print(f"    - {year}年接口：成功新增入库 {added_count} 条，拦截重复数据 {duplicate_count} 条")
+        except ValueError as e:
+            print(f"    - {year}年接口：{e}")
         except Exception as e:
             print(f"    - 请求 {year} 数据发生错误: {e}")
             
@@ -0,0 +1,239 @@
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from fetcher import init_db
+
+# 归档文件字段与开奖接口一致：expect / openTime / openCode / zodiac
+ARCHIVE_COLUMNS = ['expect', 'openTime', 'openCode', 'zodiac']
+STAGING_TABLE = 'history_import'
+HISTORY_COLUMNS = ['period', 'open_date', 'numbers', 'zodiacs', 'special', 'special_zodiac', 'raw_time']
+
+PERIOD_PATTERN = r'\d{7}'
+OPEN_TIME_PATTERN = r'\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?'
+
+def read_archive_chunks(path, chunksize):
+    """按块流式读取 CSV / JSONL 归档，全部字段按字符串读入，交由向量化校验统一处理。
+
+    CSV 优先使用 pyarrow 的多线程流式解析器，未安装时退回 pandas 分块读取。
+    """
+    lower = path.lower()
+    if lower.endswith(('.jsonl', '.ndjson', '.jsonl.gz', '.ndjson.gz')):
+        reader = pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+        for chunk in reader:
+            yield chunk.reindex(columns=ARCHIVE_COLUMNS).astype(str)
+        return
+
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        reader = pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False,
+                             usecols=lambda c: c in ARCHIVE_COLUMNS)
+        for chunk in reader:
+            yield chunk.reindex(columns=ARCHIVE_COLUMNS, fill_value='')
+        return
+
+    reader = pa_csv.open_csv(
+        path,
+        # 每行约 80 字节，按目标行数换算解析块大小
+        read_options=pa_csv.ReadOptions(block_size=max(1 << 20, chunksize * 80)),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in ARCHIVE_COLUMNS},
+            include_columns=ARCHIVE_COLUMNS,
+            include_missing_columns=True,
+            strings_can_be_null=False
+        )
+    )
+    for batch in reader:
+        yield batch.to_pandas().fillna('')
+
+def parse_codes(series):
+    """把 openCode 解析为 (N, 7) 号码矩阵，格式不合法的行号码记为 0。
+
+    标准格式 "01,02,...,49" 定长 20 字符，直接按 Unicode 码位矩阵整块解析；
+    只有非标准格式(未补零等)的少量行才逐行拆分。
+    """
+    values = series.to_numpy(dtype=str)
+    numbers = np.zeros((len(values), 7), dtype=np.int64)
+    well_formed = np.zeros(len(values), dtype=bool)
+
+    lengths = np.char.str_len(values)
+    canonical = lengths == 20
+    if canonical.any():
+        chars = values[canonical].astype('<U20').view(np.uint32).reshape(-1, 20).astype(np.int64)
+        tens = chars[:, 0::3] - 48
+        ones = chars[:, 1::3] - 48
+        commas = chars[:, 2::3]
+        ok = ((tens >= 0) & (tens <= 9) & (ones >= 0) & (ones <= 9)).all(axis=1) & (commas == ord(',')).all(axis=1)
+        numbers[canonical] = np.where(ok[:, None], tens * 10 + ones, 0)
+        well_formed[canonical] = ok
+
+    for i in np.flatnonzero(~canonical):
+        parts = values[i].split(',')
+        if len(parts) == 7 and all(p.strip().isdigit() for p in parts):
+            numbers[i] = [int(p) for p in parts]
+            well_formed[i] = True
+    return numbers, well_formed
+
+def validate_chunk(df):
+    """向量化校验一块归档数据，返回 (可直接写入 history 的合法行 DataFrame, 拒绝原因 Series)"""
+    reasons = np.full(len(df), '', dtype=object)
+
+    def reject(mask, reason):
+        reasons[np.asarray(mask, dtype=bool) & (reasons == '')] = reason
+
+    period = df['expect'].str.strip()
+    open_time = df['openTime'].str.strip()
+    codes = df['openCode'].str.strip()
+    zodiac = df['zodiac'].str.strip()
+    reject(~period.str.fullmatch(PERIOD_PATTERN).to_numpy(dtype=bool), 'bad_period')
+    reject((period.str[4:] == '000').to_numpy(dtype=bool), 'bad_period')
+    reject(~open_time.str.fullmatch(OPEN_TIME_PATTERN).to_numpy(dtype=bool), 'bad_open_time')
+    reject((period.str[:4] != open_time.str[:4]).to_numpy(dtype=bool), 'period_year_mismatch')
+
+    numbers, well_formed = parse_codes(codes)
+    reject(~well_formed, 'bad_code_format')
+    reject(~((numbers >= 1) & (numbers <= 49)).all(axis=1), 'number_out_of_range')
+    reject(~(np.diff(np.sort(numbers, axis=1), axis=1) != 0).all(axis=1), 'duplicate_numbers')
+
+    # 生肖字段：恰好 7 个非空、不含引号的片段
+    comma_count = zodiac.str.len() - zodiac.str.replace(',', '', regex=False).str.len()
+    zodiac_ok = (comma_count == 6) & ~zodiac.str.contains('"', regex=False)
+    zodiac_ok &= ~zodiac.str.contains(',,', regex=False) & ~zodiac.str.startswith(',') & ~zodiac.str.endswith(',')
+    reject(~zodiac_ok.to_numpy(dtype=bool), 'bad_zodiac')
+
+    valid = reasons == ''
+    codes = codes[valid]
+    zodiac = zodiac[valid]
+    numbers = numbers[valid]
+
+    # 生成与 fetcher 入库格式一致的 JSON 文本：标准定长格式直接做整列字符串运算
+    numbers_json = (('[' + codes.str[:17]).str.replace(',0', ',', regex=False).str.replace('[0', '[', regex=False)
+                    .str.replace(',', ', ', regex=False) + ']')
+    zodiacs_json = '["' + zodiac.str[:11].str.replace(',', '", "', regex=False) + '"]'
+    special_zodiac = zodiac.str[12:]
+
+    # 非标准格式(未补零、多字生肖)的少量行逐行生成
+    irregular = ((codes.str.len() != 20) | (zodiac.str.len() != 13)).to_numpy(dtype=bool)
+    if irregular.any():
+        numbers_json = numbers_json.astype(object)
+        zodiacs_json = zodiacs_json.astype(object)
+        special_zodiac = special_zodiac.astype(object)
+        for i in np.flatnonzero(irregular):
+            parts = zodiac.iloc[i].split(',')
+            numbers_json.iloc[i] = json.dumps(numbers[i, :6].tolist())
+            zodiacs_json.iloc[i] = json.dumps(parts[:6], ensure_ascii=False)
+            special_zodiac.iloc[i] = parts[6]
+
+    columns = {
+        'period': period[valid],
+        'open_date': open_time[valid].str[:10],
+        'numbers': numbers_json,
+        'zodiacs': zodiacs_json,
+        'special': pd.Series(numbers[:, 6]),
+        'special_zodiac': special_zodiac,
+        'raw_time': open_time[valid]
+    }
+    clean = pd.DataFrame({k: v.reset_index(drop=True) for k, v in columns.items()})
+    return clean, pd.Series(reasons[~valid], index=df.index[~valid])
+
+def bulk_import(archive_path, db_path='lottery.db', chunksize=200_000, rejects_file=None):
+    """批量导入历史归档：分块流式读取 -> 向量化校验 -> executemany 写入无索引暂存表 -> 按期号一次性并入 history。
+
+    导入期间关闭日志与同步落盘；history 的主键/唯一索引在按序整体插入时一次建好，
+    重复期号或重复开奖日期的行被 INSERT OR IGNORE 拦截并计入报告。
+    """
+    start = time.perf_counter()
+    conn = init_db(db_path)
+    cursor = conn.cursor()
+    saved_pragmas = {p: cursor.execute(f"PRAGMA {p}").fetchone()[0] for p in ('journal_mode', 'synchronous')}
+    cursor.execute("PRAGMA journal_mode = OFF")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA temp_store = MEMORY")
+    cursor.execute("PRAGMA cache_size = -262144")
+
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        # 暂存表不带任何约束与索引，executemany 只做顺序追加
+        cursor.execute(f"CREATE TABLE {STAGING_TABLE} AS SELECT {', '.join(HISTORY_COLUMNS)} FROM history WHERE 0")
+        placeholders = ', '.join(['?'] * len(HISTORY_COLUMNS))
+
+        total_rows = 0
+        staged_rows = 0
+        reject_counts = {}
+        rejects_header = True
+        # 归档本身按期号有序时，并入 history 无需再排序
+        input_sorted = True
+        last_period = None
+        cursor.execute("BEGIN")
+        for chunk in read_archive_chunks(archive_path, chunksize):
+            clean, reasons = validate_chunk(chunk)
+            total_rows += len(chunk)
+            staged_rows += len(clean)
+            for reason, count in reasons.value_counts().items():
+                reject_counts[reason] = reject_counts.get(reason, 0) + int(count)
+            if rejects_file and len(reasons):
+                rejected = chunk.loc[reasons.index].assign(reason=reasons)
+                rejected.to_csv(rejects_file, mode='w' if rejects_header else 'a', header=rejects_header, index=False)
+                rejects_header = False
+
+            if len(clean):
+                periods = clean['period']
+                input_sorted &= periods.is_monotonic_increasing and (last_period is None or periods.iloc[0] > last_period)
+                last_period = periods.iloc[-1]
+
+            columns = [clean[c].tolist() for c in clean.columns]
+            cursor.executemany(f"INSERT INTO {STAGING_TABLE} VALUES ({placeholders})", zip(*columns))
+            print(f"    - 已处理 {total_rows} 行，暂存合法数据 {staged_rows} 行")
+
+        # 按期号顺序整体并入 history：主键与唯一索引按序追加构建，重复行由 OR IGNORE 拦截
+        columns = ', '.join(HISTORY_COLUMNS)
+        order_by = '' if input_sorted else ' ORDER BY period'
+        cursor.execute(f"INSERT OR IGNORE INTO history ({columns}) SELECT {columns} FROM {STAGING_TABLE}{order_by}")
+        inserted_rows = cursor.rowcount
+    finally:
+        # 无论成功或中途失败都清理暂存表并恢复 pragma；history 只在最后一步并入时写入，暂存阶段失败不会改动它
+        # (journal_mode=OFF 下 ROLLBACK 行为未定义，因此以删除暂存表后提交的方式结束事务)
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        conn.commit()
+        for pragma, value in saved_pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    report = {
+        'total_rows': total_rows,
+        'inserted': inserted_rows,
+        'duplicates': staged_rows - inserted_rows,
+        'rejected': sum(reject_counts.values()),
+        'reject_reasons': reject_counts,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(total_rows / elapsed) if elapsed > 0 else 0
+    }
+    print(f"[成功] 批量导入完毕：读取 {total_rows} 行 | 入库 {inserted_rows} 条 | 重复拦截 {report['duplicates']} 条 | 校验拒绝 {report['rejected']} 条")
+    for reason, count in sorted(reject_counts.items(), key=lambda x: -x[1]):
+        print(f"    - 拒绝原因 {reason}: {count} 行")
+    print(f"    - 耗时 {elapsed:.2f}s，吞吐 {report['rows_per_second']} 行/秒")
+    return report
+
+if __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
+
+    parser = argparse.ArgumentParser(description='批量导入 CSV / JSONL 开奖历史归档')
+    parser.add_argument('archive', help='归档文件路径 (.csv / .jsonl，可带 .gz)')
+    parser.add_argument('--db', default='lottery.db')
+    parser.add_argument('--chunksize', type=int, default=200_000, help='每块读取的行数')
+    parser.add_argument('--rejects', default=None, help='把被拒绝的行及原因写入该 CSV 文件')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        print(f"错误：找不到归档文件 {args.archive}")
+        sys.exit(1)
+    print(f">>> 正在批量导入 {args.archive} -> {args.db} ...")
+    bulk_import(args.archive, db_path=args.db, chunksize=args.chunksize, rejects_file=args.rejects)
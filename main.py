@@ -3,10 +3,10 @@ import subprocess
 import json
 import sys
 import io
+import time
+import shutil
 import datetime
-
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='ignore')
+import contextlib
 
 # 文件路径配置
 LOTTERY_DATA_FILE = 'lottery_complete.json'
@@ -15,6 +15,23 @@ PREDICTION_RESULT_FILE = 'prediction.json'
 CHART_DATA_FILE = 'chart_data.json'
 REPORT_FILE = 'lottery_analysis_report.md'
 
+# 双引擎并发推演配置：总时限(秒)、各引擎独立输出、逐期分歧日志
+PREDICTOR_TIME_BUDGET = float(os.environ.get('PREDICTOR_TIME_BUDGET', '120'))
+PRO_PREDICTION_FILE = 'prediction_pro.json'
+BASE_PREDICTION_FILE = 'prediction_base.json'
+ENGINE_DIVERGENCE_LOG = 'engine_divergence.jsonl'
+
+# 最近一次 main() 各阶段耗时(秒)，供回放压测等外部工具读取
+STAGE_TIMINGS = {}
+
+@contextlib.contextmanager
+def timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_TIMINGS[name] = time.perf_counter() - start
+
 def run_script(script_name, *args):
     cmd = [sys.executable, script_name] + list(args)
     print(f"\n>>> 正在运行: {' '.join(cmd)}")
@@ -25,27 +42,90 @@ def run_script(script_name, *args):
     print(process.stdout)
     return process.stdout
 
-def run_predictor_with_fallback():
-    """智能容灾降级机制：优先跑 Pro 版，报错则自动回退旧版"""
-    print("\n>>> 🚀 尝试启动 [资金热力反推引擎] (predictor_pro.py)...")
-    cmd_pro = [sys.executable, 'predictor_pro.py']
-    process_pro = subprocess.run(cmd_pro, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-    
-    if process_pro.returncode == 0:
-        print(process_pro.stdout)
-        return
-        
-    print(f"⚠️ [Pro 版本运行异常] (系统已拦截):\n{process_pro.stderr}")
-    print(">>> 🔄 触发自动降级保护：正在切换回备用引擎 (predictor.py)...")
-    
-    cmd_base = [sys.executable, 'predictor.py']
-    process_base = subprocess.run(cmd_base, capture_output=True, text=True, encoding='utf-8', errors='ignore')
-    
-    if process_base.returncode == 0:
-        print(process_base.stdout)
+def wait_engine(process, deadline):
+    """在截止时间前等待引擎结束，超时则强制终止。返回 (状态, stdout, stderr)"""
+    # 已经退出的进程直接收取输出，避免时限耗尽时误判为超时
+    timeout = None if process.poll() is not None else max(0.0, deadline - time.monotonic())
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        stdout, stderr = process.communicate()
+        return 'timeout', stdout, stderr
+    return ('ok' if process.returncode == 0 else 'error'), stdout, stderr
+
+def load_prediction(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def log_engine_divergence(engines, chosen):
+    """逐期记录两个引擎的推演分歧 (首选特码、Top6 重合度、正码重合度)"""
+    pro = load_prediction(PRO_PREDICTION_FILE) if engines['pro']['status'] == 'ok' else None
+    base = load_prediction(BASE_PREDICTION_FILE) if engines['base']['status'] == 'ok' else None
+    entry = {
+        'next_period': (pro or base or {}).get('next_period'),
+        'chosen': chosen,
+        'engines': {name: {'status': e['status'], 'seconds': round(e['seconds'], 3)} for name, e in engines.items()}
+    }
+    if pro and base:
+        pro_top6 = pro['recommendation']['special_numbers']
+        base_top6 = base['recommendation']['special_numbers']
+        entry.update({
+            'primary_special': {'pro': pro['primary_special'], 'base': base['primary_special']},
+            'primary_agree': pro['primary_special'] == base['primary_special'],
+            'top6_overlap': len(set(pro_top6) & set(base_top6)),
+            'normal_overlap': len(set(pro['recommended_normal']) & set(base['recommended_normal']))
+        })
+        print(f"    - 双引擎分歧：首选特码 {pro['primary_special']:02d} vs {base['primary_special']:02d} | Top6 重合 {entry['top6_overlap']}/6 | 正码重合 {entry['normal_overlap']}/6")
+    with open(ENGINE_DIVERGENCE_LOG, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+def run_predictor_with_fallback(time_budget=PREDICTOR_TIME_BUDGET, db_path='lottery.db'):
+    """智能容灾降级机制：Pro 版与旧版并发运行，共用一个截止时间。
+
+    Pro 版在时限内成功则采用其结果，否则采用旧版结果；两者都保留并记录分歧。
+    无论哪个引擎卡死，本阶段耗时都不超过 time_budget 秒。
+    """
+    print(f"\n>>> 🚀 并发启动 [资金热力反推引擎] (predictor_pro.py) 与备用引擎 (predictor.py)，时限 {time_budget:.0f}s...")
+    scripts = {'pro': ('predictor_pro.py', PRO_PREDICTION_FILE), 'base': ('predictor.py', BASE_PREDICTION_FILE)}
+
+    start = time.monotonic()
+    deadline = start + time_budget
+    processes = {}
+    for name, (script, output) in scripts.items():
+        if os.path.exists(output):
+            os.remove(output)
+        processes[name] = subprocess.Popen(
+            [sys.executable, script, output, db_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='ignore'
+        )
+
+    engines = {}
+    for name in ('pro', 'base'):
+        status, stdout, stderr = wait_engine(processes[name], deadline)
+        engines[name] = {'status': status, 'stdout': stdout, 'stderr': stderr, 'seconds': time.monotonic() - start}
+
+    if engines['pro']['status'] == 'ok':
+        chosen = 'pro'
+        print(engines['pro']['stdout'])
     else:
-        print(f"❌ [致命错误] 备用引擎也运行失败：\n{process_base.stderr}")
-        exit(1)
+        if engines['pro']['status'] == 'timeout':
+            print(f"⚠️ [Pro 版本超时] 超过 {time_budget:.0f}s 未完成，已强制终止")
+        else:
+            print(f"⚠️ [Pro 版本运行异常] (系统已拦截):\n{engines['pro']['stderr']}")
+        print(">>> 🔄 触发自动降级保护：采用备用引擎 (predictor.py) 的并发结果...")
+        if engines['base']['status'] != 'ok':
+            log_engine_divergence(engines, None)
+            print(f"❌ [致命错误] 备用引擎也运行失败 ({engines['base']['status']})：\n{engines['base']['stderr']}")
+            exit(1)
+        chosen = 'base'
+        print(engines['base']['stdout'])
+
+    shutil.copyfile(scripts[chosen][1], PREDICTION_RESULT_FILE)
+    log_engine_divergence(engines, chosen)
 
 def generate_report(latest_prediction, analysis_data):
     print("\n>>> 正在组装行为金融反杀大屏报告...")
@@ -107,21 +187,30 @@ def main():
             try: os.remove(f)
             except: pass
 
-    run_script('fetcher.py')
-    run_script('analyzer.py')
+    STAGE_TIMINGS.clear()
+    with timed_stage('fetch'):
+        run_script('fetcher.py')
+    with timed_stage('analyze'):
+        run_script('analyzer.py')
+    with timed_stage('export'):
+        run_script('exporter.py')
     
     # 执行包含降级机制的热力引擎
-    run_predictor_with_fallback()
+    with timed_stage('predict'):
+        run_predictor_with_fallback()
 
-    with open(PREDICTION_RESULT_FILE, 'r', encoding='utf-8') as f:
-        prediction_data = json.load(f)
-    with open(ANALYSIS_RESULT_FILE, 'r', encoding='utf-8') as f:
-        analysis_data = json.load(f)
+    with timed_stage('report'):
+        with open(PREDICTION_RESULT_FILE, 'r', encoding='utf-8') as f:
+            prediction_data = json.load(f)
+        with open(ANALYSIS_RESULT_FILE, 'r', encoding='utf-8') as f:
+            analysis_data = json.load(f)
 
-    generate_report(prediction_data, analysis_data)
+        generate_report(prediction_data, analysis_data)
     print("\n=========================================")
     print("✅ 行为金融流水线执行完毕！请刷新极客大屏查看最终矩阵。")
     print("=========================================\n")
 
 if __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='ignore')
     main()
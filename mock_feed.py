@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def load_items_from_db(db_path='lottery.db'):
+    """把本地 history 表还原成开奖接口的原始条目格式 (按期号升序)"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT period, raw_time, numbers, zodiacs, special, special_zodiac FROM history ORDER BY period ASC")
+    rows = cursor.fetchall()
+    conn.close()
+
+    items = []
+    for period, raw_time, numbers, zodiacs, special, special_zodiac in rows:
+        codes = json.loads(numbers) + [special]
+        zodiac_list = json.loads(zodiacs) + [special_zodiac]
+        items.append({
+            "expect": period,
+            "openTime": raw_time,
+            "openCode": ','.join(f"{n:02d}" for n in codes),
+            "zodiac": ','.join(zodiac_list)
+        })
+    return items
+
+class MockFeed:
+    """本地替身数据源：按期逐条“开奖”，模拟 history.macaumarksix.com 的年份接口"""
+
+    def __init__(self, items, visible=0):
+        self.items = items
+        self.visible = visible
+        self.published_at = {}
+        self.lock = threading.Lock()
+
+    def publish_next(self):
+        """放出下一期开奖，全部放完后返回 None"""
+        with self.lock:
+            if self.visible >= len(self.items):
+                return None
+            item = self.items[self.visible]
+            self.visible += 1
+            # 记录放出时刻，供联调时计算 “放出 -> 报告刷新” 的真实端到端延迟
+            self.published_at[item['expect']] = time.time()
+            return item
+
+    def items_for_year(self, year):
+        with self.lock:
+            published = self.items[:self.visible]
+            published_at = dict(self.published_at)
+        # 与线上接口一致：最新一期排在最前。运行中放出的期次额外带上 publishedAt，供监听端计算真实延迟
+        return [
+            dict(item, publishedAt=published_at[item['expect']]) if item['expect'] in published_at else item
+            for item in reversed(published) if item['openTime'].startswith(str(year))
+        ]
+
+def make_handler(feed):
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = self.path.rstrip('/').split('/')
+            if len(parts) < 2 or parts[-2] != 'y' or not parts[-1].isdigit():
+                self.send_error(404)
+                return
+            body = json.dumps({
+                "code": 200,
+                "result": True,
+                "message": "操作成功",
+                "data": feed.items_for_year(int(parts[-1]))
+            }, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FeedHandler
+
+def start_mock_feed(feed, host='127.0.0.1', port=0):
+    """在后台线程启动替身服务，返回 (server, base_url)。port=0 时由系统分配空闲端口"""
+    server = ThreadingHTTPServer((host, port), make_handler(feed))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/history/macaujc2/y"
+    return server, base_url
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地开奖接口替身服务')
+    parser.add_argument('--db', default='lottery.db', help='提供开奖数据的源数据库')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--visible', type=int, default=0, help='启动时已公开的期数')
+    parser.add_argument('--interval', type=float, default=60.0, help='每隔多少秒放出下一期')
+    args = parser.parse_args()
+
+    feed = MockFeed(load_items_from_db(args.db), visible=args.visible)
+    server, base_url = start_mock_feed(feed, port=args.port)
+    print(f">>> 替身数据源已启动: {base_url}/<year> (已公开 {feed.visible}/{len(feed.items)} 期)")
+    try:
+        while True:
+            time.sleep(args.interval)
+            item = feed.publish_next()
+            if item is None:
+                print(">>> 全部期数已放出。")
+                break
+            print(f"    - 放出第 {item['expect']} 期 ({item['openTime']})")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
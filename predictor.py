@@ -3,6 +3,11 @@ import sqlite3
 import datetime
 from collections import deque
 import os
+import sys
+
+# 尾窗模式：只读取最近 K 期 (设为 0 恢复全量扫描)。K 不小于 30，保证 10/30/5 期窗口完整
+TAIL_WINDOW = int(os.environ.get('PREDICTOR_TAIL_WINDOW', '1000'))
+MIN_TAIL_WINDOW = 30
 
 def get_current_zodiac_map():
     zodiac_order = ['鼠', '牛', '虎', '兔', '龍', '蛇', '馬', '羊', '猴', '雞', '狗', '豬']
@@ -39,11 +44,16 @@ def get_color_map():
         '绿': [5, 6, 11, 16, 17, 21, 22, 27, 28, 32, 33, 38, 39, 43, 44, 49]
     }
 
-def get_records_from_db(db_path='lottery.db'):
+def get_records_from_db(db_path='lottery.db', window=None):
+    """按期号升序返回开奖记录；指定 window 时只倒序读取最近 window 期再翻转为升序"""
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    cursor.execute("SELECT period, numbers, special, special_zodiac FROM history ORDER BY period ASC")
-    rows = cursor.fetchall()
+    if window:
+        cursor.execute("SELECT period, numbers, special, special_zodiac FROM history ORDER BY period DESC LIMIT ?", (window,))
+        rows = cursor.fetchall()[::-1]
+    else:
+        cursor.execute("SELECT period, numbers, special, special_zodiac FROM history ORDER BY period ASC")
+        rows = cursor.fetchall()
     conn.close()
     
     records = []
@@ -56,8 +66,33 @@ def get_records_from_db(db_path='lottery.db'):
         })
     return records
 
-def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
-    records = get_records_from_db(db_file)
+def lookup_misses_before(db_path, numbers, before_period):
+    """查询尾窗之外的号码遗漏值：沿主键倒序找到 before_period 之前最后一次开出的期号，再数其后的期数。
+
+    从未开出过的号码遗漏值为总期数，与全量扫描口径一致。
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    misses = {}
+    for n in numbers:
+        cursor.execute(
+            "SELECT period FROM history WHERE period < ? "
+            "AND (special = ? OR EXISTS (SELECT 1 FROM json_each(numbers) WHERE value = ?)) "
+            "ORDER BY period DESC LIMIT 1",
+            (before_period, n, n)
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("SELECT COUNT(*) FROM history WHERE period > ?", (row[0],))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM history")
+        misses[n] = cursor.fetchone()[0]
+    conn.close()
+    return misses
+
+def predict_next_period(db_file='lottery.db', output_file='prediction.json', tail_window=TAIL_WINDOW):
+    window = max(tail_window, MIN_TAIL_WINDOW) if tail_window else None
+    records = get_records_from_db(db_file, window=window)
     if not records:
         print("错误：数据库为空。")
         return
@@ -87,6 +122,11 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
             if n in curr_nums: miss_tracker[n] = 0
             else: miss_tracker[n] += 1
 
+    # 尾窗被读满时，窗口内从未开出的号码需回库补查真实遗漏值
+    if window and len(records) == window:
+        unseen = [n for n, miss in miss_tracker.items() if miss == len(records)]
+        miss_tracker.update(lookup_misses_before(db_file, unseen, records[0]['period']))
+
     for past_nums in list(recent_30_queue)[-10:]:
         for n in past_nums: freq_10[n] += 1
 
@@ -181,4 +221,6 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
     print(f"✅ 庄家高精度盲区矩阵已生成！分析源已写入 {output_file}，准备通过主程序推送大屏。")
 
 if __name__ == '__main__':
-    predict_next_period()
+    # 可选参数：输出文件路径 (主控并发运行双引擎时各写各的文件)、数据库路径
+    predict_next_period(db_file=sys.argv[2] if len(sys.argv) > 2 else 'lottery.db',
+                        output_file=sys.argv[1] if len(sys.argv) > 1 else 'prediction.json')
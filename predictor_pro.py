@@ -3,6 +3,20 @@ import sqlite3
 import datetime
 from collections import deque
 import os
+import sys
+import numpy as np
+from analyzer import StreakIndex, GapEngine, STREAK_ATTRIBUTES, special_attributes
+
+# 尾窗模式：只读取最近 K 期 (设为 0 恢复全量扫描)。K 不小于 30，保证 10/30/5 期窗口完整
+TAIL_WINDOW = int(os.environ.get('PREDICTOR_TAIL_WINDOW', '1000'))
+MIN_TAIL_WINDOW = 30
+# 号码自身间隔样本不足时，退回全局经验阈值
+MIN_GAP_SAMPLES = 5
+# 断龙规则：特码某属性连开达到期数阈值后，与之不同属性的号码追加的热度
+# 波色与回测模型一致；生肖连开 2 期已属罕见，阈值取 2
+STREAK_BREAK_RULES = {'color': (3, 120.0), 'zodiac': (2, 60.0), 'size': (3, 60.0), 'parity': (3, 60.0)}
+# 分析阶段写出的全量间隔分布，尾窗模式下直接复用
+CHART_DATA_FILE = 'chart_data.json'
 
 def get_current_zodiac_map():
     zodiac_order = ['鼠', '牛', '虎', '兔', '龍', '蛇', '馬', '羊', '猴', '雞', '狗', '豬']
@@ -39,11 +53,16 @@ def get_color_map():
         '绿': [5, 6, 11, 16, 17, 21, 22, 27, 28, 32, 33, 38, 39, 43, 44, 49]
     }
 
-def get_records_from_db(db_path='lottery.db'):
+def get_records_from_db(db_path='lottery.db', window=None):
+    """按期号升序返回开奖记录；指定 window 时只倒序读取最近 window 期再翻转为升序"""
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    cursor.execute("SELECT period, numbers, special, special_zodiac FROM history ORDER BY period ASC")
-    rows = cursor.fetchall()
+    if window:
+        cursor.execute("SELECT period, numbers, special, special_zodiac FROM history ORDER BY period DESC LIMIT ?", (window,))
+        rows = cursor.fetchall()[::-1]
+    else:
+        cursor.execute("SELECT period, numbers, special, special_zodiac FROM history ORDER BY period ASC")
+        rows = cursor.fetchall()
     conn.close()
     
     records = []
@@ -56,8 +75,54 @@ def get_records_from_db(db_path='lottery.db'):
         })
     return records
 
-def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
-    records = get_records_from_db(db_file)
+def lookup_misses_before(db_path, numbers, before_period):
+    """查询尾窗之外的号码遗漏值：沿主键倒序找到 before_period 之前最后一次开出的期号，再数其后的期数。
+
+    从未开出过的号码遗漏值为总期数，与全量扫描口径一致。
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    misses = {}
+    for n in numbers:
+        cursor.execute(
+            "SELECT period FROM history WHERE period < ? "
+            "AND (special = ? OR EXISTS (SELECT 1 FROM json_each(numbers) WHERE value = ?)) "
+            "ORDER BY period DESC LIMIT 1",
+            (before_period, n, n)
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("SELECT COUNT(*) FROM history WHERE period > ?", (row[0],))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM history")
+        misses[n] = cursor.fetchone()[0]
+    conn.close()
+    return misses
+
+def load_full_gap_engine(db_path, latest_period, miss_tracker, chart_file=CHART_DATA_FILE):
+    """尾窗模式下读取分析阶段的全量间隔分布。
+
+    只有当文件记录的总期数、最新期号与当前数据库一致，且各号遗漏也对得上时才复用，否则返回 None。
+    """
+    try:
+        with open(chart_file, 'r', encoding='utf-8') as f:
+            chart_data = json.load(f)
+        gap_stats = chart_data['gap_stats']
+        source = chart_data['gap_stats_source']
+    except (OSError, ValueError, KeyError):
+        return None
+    conn = sqlite3.connect(db_path)
+    total = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    conn.close()
+    if source.get('total_records') != total or source.get('latest_period') != latest_period:
+        return None
+    if any(gap_stats.get(str(n), {}).get('current_miss') != miss_tracker[n] for n in range(1, 50)):
+        return None
+    return GapEngine.from_dict(gap_stats, total)
+
+def predict_next_period(db_file='lottery.db', output_file='prediction.json', tail_window=TAIL_WINDOW):
+    window = max(tail_window, MIN_TAIL_WINDOW) if tail_window else None
+    records = get_records_from_db(db_file, window=window)
     if not records:
         print("错误：数据库为空。")
         return
@@ -87,6 +152,11 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
             if n in curr_nums: miss_tracker[n] = 0
             else: miss_tracker[n] += 1
 
+    # 尾窗被读满时，窗口内从未开出的号码需回库补查真实遗漏值
+    if window and len(records) == window:
+        unseen = [n for n, miss in miss_tracker.items() if miss == len(records)]
+        miss_tracker.update(lookup_misses_before(db_file, unseen, records[0]['period']))
+
     for past_nums in list(recent_30_queue)[-10:]:
         for n in past_nums: freq_10[n] += 1
 
@@ -94,6 +164,23 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
     recent_5_big = sum(1 for r in reversed_hist[:5] for n in r['numbers']+[r['special']] if n >= 25)
     recent_5_odd = sum(1 for r in reversed_hist[:5] for n in r['numbers']+[r['special']] if n % 2 != 0)
     
+    # 断龙因子只看当前连开是否达到阈值 (均不超过 30 期)，尾窗内即可判定
+    streak_index = StreakIndex(records)
+    current_streaks = {attr: streak_index.current_streak(attr) for attr in STREAK_ATTRIBUTES}
+
+    # 倍投雪球阈值：按每个号码自身历史间隔的分位数确定 (P75 起追，P95 以上为极限追冷)
+    # 尾窗模式优先复用分析阶段的全量间隔分布；缺失或过期时回库全量构建，保证与全量扫描结果一致
+    if window and len(records) == window:
+        gap_engine = load_full_gap_engine(db_file, latest['period'], miss_tracker)
+        if gap_engine is None:
+            print("⚠️ 未找到与当前数据库一致的全量间隔分布，间隔分位数改为全量扫描构建")
+            gap_engine = GapEngine(get_records_from_db(db_file))
+    else:
+        gap_engine = GapEngine(records)
+    enough_gaps = gap_engine.gap_counts() >= MIN_GAP_SAMPLES
+    snowball_line = np.where(enough_gaps, gap_engine.quantiles(0.75), 10)
+    extreme_line = np.where(enough_gaps, gap_engine.quantiles(0.95), 20)
+
     big_heavy_bet = recent_5_big > 20
     small_heavy_bet = recent_5_big < 15
     odd_heavy_bet = recent_5_odd > 20
@@ -110,9 +197,9 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
         if n <= 31: heat += 25.0
             
         # 2. 赌徒谬误：追冷倍投 (极高权重)
-        if miss_tracker[n] >= 10:
-            heat += 15.0 + (miss_tracker[n] - 10) * 8.0 
-        if miss_tracker[n] > 20:
+        if miss_tracker[n] >= snowball_line[n]:
+            heat += 15.0 + (miss_tracker[n] - snowball_line[n]) * 8.0 
+        if miss_tracker[n] > extreme_line[n]:
             heat += 100.0 
 
         # 3. 追涨杀跌：旺码跟风 (高权重)
@@ -127,7 +214,14 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
         if odd_heavy_bet and not is_odd: heat += 60.0
         if even_heavy_bet and is_odd: heat += 60.0
 
-        # 5. 🌟 微观惩罚梯度 (打破同分并列)
+        # 5. 断龙博反转：特码波色/生肖/大小/单双连开，散户押注其他属性博断龙
+        num_attrs = special_attributes({'special': n, 'special_zodiac': NUM_TO_ZODIAC.get(n)})
+        for attr, (min_len, weight) in STREAK_BREAK_RULES.items():
+            streak_value, streak_len = current_streaks[attr]
+            if streak_len >= min_len and num_attrs[attr] != streak_value:
+                heat += weight
+
+        # 6. 🌟 微观惩罚梯度 (打破同分并列)
         # 即使都在盲区，遗漏值相对较大或数字靠后的号码，天然会多吸附一丝丝散户视线
         micro_gradient = (miss_tracker[n] * 0.1) + (n * 0.01)
         heat += micro_gradient
@@ -181,4 +275,6 @@ def predict_next_period(db_file='lottery.db', output_file='prediction.json'):
     print(f"✅ 庄家高精度盲区矩阵已生成！分析源已写入 {output_file}，准备通过主程序推送大屏。")
 
 if __name__ == '__main__':
-    predict_next_period()
+    # 可选参数：输出文件路径 (主控并发运行双引擎时各写各的文件)、数据库路径
+    predict_next_period(db_file=sys.argv[2] if len(sys.argv) > 2 else 'lottery.db',
+                        output_file=sys.argv[1] if len(sys.argv) > 1 else 'prediction.json')
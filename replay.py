@@ -0,0 +1,149 @@
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import contextlib
+
+import main
+from mock_feed import MockFeed, load_items_from_db, start_mock_feed
+
+# 回放时复制到独立工作目录的流水线脚本 (main() 以子进程方式按相对路径调用它们)
+PIPELINE_SCRIPTS = ['main.py', 'fetcher.py', 'analyzer.py', 'exporter.py', 'predictor.py', 'predictor_pro.py']
+TRACKED_ARTIFACTS = [
+    main.ANALYSIS_RESULT_FILE, main.CHART_DATA_FILE, main.PREDICTION_RESULT_FILE,
+    main.REPORT_FILE, main.ENGINE_DIVERGENCE_LOG
+]
+
+def path_size(path):
+    """文件或目录(递归)的字节数，不存在时为 0"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+def count_rows(db_path):
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path)
+    count = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    conn.close()
+    return count
+
+def prepare_workdir(workdir):
+    """准备回放工作目录。必须为空目录：残留的 lottery.db / 分歧日志会让第一天就从满库开始，曲线失真"""
+    if os.path.isdir(workdir) and os.listdir(workdir):
+        raise ValueError(f"回放工作目录 {workdir} 非空，请指定新目录或先清空")
+    os.makedirs(workdir, exist_ok=True)
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for script in PIPELINE_SCRIPTS:
+        shutil.copy(os.path.join(src_dir, script), os.path.join(workdir, script))
+
+def replay_history(db_path='lottery.db', workdir=None, days=None, warmup=0, verbose=False):
+    """逐日回放：替身接口每天放出一期，完整驱动一次 main.main()，记录各阶段耗时与产物体积。
+
+    warmup 期在第一天之前就已公开(第一天会一次性同步入库)；days 限制回放天数。
+    整个过程离线运行，不会改动仓库里的数据库和产物。
+    """
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix='lottery_replay_'))
+    prepare_workdir(workdir)
+
+    items = load_items_from_db(db_path)
+    feed = MockFeed(items, visible=min(warmup, len(items)))
+    server, base_url = start_mock_feed(feed)
+    total_days = len(items) - feed.visible if days is None else min(days, len(items) - feed.visible)
+    print(f">>> 🎬 开始离线回放：{total_days} 天 | 替身接口 {base_url} | 工作目录 {workdir}")
+
+    saved_env = {k: os.environ.get(k) for k in ('LOTTERY_API_BASE', 'LOTTERY_FETCH_YEAR')}
+    saved_cwd = os.getcwd()
+    os.environ['LOTTERY_API_BASE'] = base_url
+    os.chdir(workdir)
+
+    timeline = []
+    try:
+        for day in range(1, total_days + 1):
+            item = feed.publish_next()
+            os.environ['LOTTERY_FETCH_YEAR'] = item['openTime'][:4]
+
+            start = time.perf_counter()
+            status = 'ok'
+            output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            try:
+                with output:
+                    main.main()
+            except SystemExit:
+                status = 'failed'
+            elapsed = time.perf_counter() - start
+
+            entry = {
+                'day': day,
+                'period': item['expect'],
+                'status': status,
+                'total_seconds': round(elapsed, 4),
+                'stages': {k: round(v, 4) for k, v in main.STAGE_TIMINGS.items()},
+                'db_rows': count_rows('lottery.db'),
+                'db_bytes': path_size('lottery.db'),
+                'artifact_bytes': {name: path_size(name) for name in TRACKED_ARTIFACTS + ['history_parquet']}
+            }
+            timeline.append(entry)
+            if day == 1 or day % 50 == 0 or day == total_days or status != 'ok':
+                print(f"    - 第 {day:>4} 天 | 第 {entry['period']} 期 | {status} | 耗时 {elapsed:.2f}s | 库 {entry['db_rows']} 行 / {entry['db_bytes'] / 1024:.0f} KB")
+    finally:
+        os.chdir(saved_cwd)
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        server.shutdown()
+
+    return {'workdir': workdir, 'days': len(timeline), 'timeline': timeline}
+
+def summarize_replay(result, bucket=100):
+    """按 bucket 天分段汇总平均阶段耗时，观察耗时随历史增长的曲线"""
+    timeline = result['timeline']
+    print("-" * 75)
+    print(f"📈 [回放性能曲线] 共 {result['days']} 天，每 {bucket} 天一段的平均耗时(秒)：")
+    stages = ['fetch', 'analyze', 'export', 'predict', 'report']
+    print(f"{'天数':<12}" + ''.join(f"{s:>10}" for s in stages) + f"{'total':>10}{'库(KB)':>10}")
+    for start in range(0, len(timeline), bucket):
+        chunk = timeline[start:start + bucket]
+        means = [sum(e['stages'].get(s, 0.0) for e in chunk) / len(chunk) for s in stages]
+        total = sum(e['total_seconds'] for e in chunk) / len(chunk)
+        label = f"{chunk[0]['day']}-{chunk[-1]['day']}"
+        print(f"{label:<12}" + ''.join(f"{m:>10.3f}" for m in means) + f"{total:>10.3f}{chunk[-1]['db_bytes'] / 1024:>10.0f}")
+    failed = sum(1 for e in timeline if e['status'] != 'ok')
+    if failed:
+        print(f"⚠️ 共有 {failed} 天流水线执行失败")
+    print("-" * 75)
+
+if __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='ignore')
+
+    parser = argparse.ArgumentParser(description='离线逐日回放完整流水线，测量耗时与数据增长曲线')
+    parser.add_argument('--db', default='lottery.db', help='提供历史开奖的源数据库 (只读)')
+    parser.add_argument('--workdir', default=None, help='回放工作目录，默认使用临时目录')
+    parser.add_argument('--days', type=int, default=None, help='回放天数，默认回放全部期数')
+    parser.add_argument('--warmup', type=int, default=0, help='回放开始前已公开的期数')
+    parser.add_argument('--output', default='replay_report.json', help='逐日明细输出文件')
+    parser.add_argument('--verbose', action='store_true', help='显示每天流水线的完整输出')
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.output)
+    try:
+        result = replay_history(db_path=os.path.abspath(args.db), workdir=args.workdir, days=args.days,
+                                warmup=args.warmup, verbose=args.verbose)
+    except ValueError as e:
+        print(f"错误：{e}")
+        sys.exit(1)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    summarize_replay(result)
+    print(f"回放明细已写入 {output_path}")
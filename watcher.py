@@ -0,0 +1,184 @@
+import sys
+import io
+import json
+import time
+import argparse
+import datetime
+import requests
+
+import fetcher
+import analyzer
+import exporter
+from main import ANALYSIS_RESULT_FILE, PREDICTION_RESULT_FILE, CHART_DATA_FILE, generate_report, run_predictor_with_fallback
+
+BEIJING_TZ = datetime.timezone(datetime.timedelta(hours=8))
+LATENCY_LOG_FILE = 'watcher_latency.jsonl'
+
+# 澳门开奖时间约为北京时间 21:32
+DEFAULT_DRAW_TIME = '21:32'
+
+def parse_draw_time(draw_time):
+    hour, minute = draw_time.split(':')
+    return int(hour), int(minute)
+
+def get_latest_db_record(db_path):
+    """返回数据库中最新一期的 (期号, 开奖时间)，空库返回 (None, None)"""
+    conn = fetcher.init_db(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT period, raw_time FROM history ORDER BY period DESC LIMIT 1")
+    row = cursor.fetchone()
+    conn.close()
+    return row if row else (None, None)
+
+def next_poll_interval(now, draw_time, caught_up, fast_interval, idle_interval, lead=300, tail=1800):
+    """自适应轮询间隔：开奖前 lead 秒到开奖后 tail 秒内快速轮询，其余时间休眠至下个窗口(不超过 idle_interval)"""
+    hour, minute = parse_draw_time(draw_time)
+    draw_today = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    window_start = draw_today - datetime.timedelta(seconds=lead)
+    window_end = draw_today + datetime.timedelta(seconds=tail)
+
+    if window_start <= now <= window_end and not caught_up:
+        return fast_interval
+
+    next_start = window_start if now < window_start else window_start + datetime.timedelta(days=1)
+    seconds_to_window = (next_start - now).total_seconds()
+    return max(fast_interval, min(idle_interval, seconds_to_window))
+
+def run_pipeline_in_process(db_path='lottery.db'):
+    """依次执行 分析 -> 导出 -> 推演 -> 报告，返回各阶段耗时(秒)。
+
+    推演阶段与 main.py 共用双引擎并发 + 截止时间机制，任一引擎卡死都不会拖住监听进程。
+    """
+    timings = {}
+
+    t0 = time.perf_counter()
+    analyzer.analyze_data(db_path, ANALYSIS_RESULT_FILE, CHART_DATA_FILE)
+    timings['analyze'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    exporter.export_history_parquet(db_path)
+    timings['export'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    try:
+        run_predictor_with_fallback(db_path=db_path)
+    except SystemExit:
+        raise RuntimeError("双引擎均未在时限内产出推演结果")
+    timings['predict'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with open(PREDICTION_RESULT_FILE, 'r', encoding='utf-8') as f:
+        prediction_data = json.load(f)
+    with open(ANALYSIS_RESULT_FILE, 'r', encoding='utf-8') as f:
+        analysis_data = json.load(f)
+    generate_report(prediction_data, analysis_data)
+    timings['report'] = time.perf_counter() - t0
+
+    return timings
+
+def poll_once(db_path, base_url=None, session=None):
+    """轮询一次当年接口。发现新期号则入库并返回最新条目，否则返回 None"""
+    latest_period, _ = get_latest_db_record(db_path)
+    year = datetime.datetime.now(BEIJING_TZ).year
+    items = fetcher.fetch_year_items(year, base_url=base_url, session=session)
+    if not items:
+        return None
+
+    newest = max(items, key=lambda item: item['expect'])
+    if latest_period is not None and newest['expect'] <= latest_period:
+        return None
+
+    conn = fetcher.init_db(db_path)
+    added_count, _ = fetcher.save_items(conn.cursor(), items)
+    conn.commit()
+    conn.close()
+
+    # 入库被唯一约束拦截(如同日重复数据)时不触发流水线，避免对同一期反复重算
+    if get_latest_db_record(db_path)[0] != newest['expect']:
+        print(f"    - 第 {newest['expect']} 期未能入库，跳过本次刷新")
+        return None
+    print(f"\n>>> 🔔 侦测到新一期开奖: 第 {newest['expect']} 期 ({newest['openTime']})，新增入库 {added_count} 条")
+    return newest
+
+def record_latency(item, detected_at, finished_at, timings, log_file=LATENCY_LOG_FILE):
+    """记录延迟。本地替身放出的条目带 publishedAt (真实放出时刻)，以它为起点；线上条目以开奖时间为起点"""
+    if 'publishedAt' in item:
+        reference = datetime.datetime.fromtimestamp(item['publishedAt'], BEIJING_TZ)
+        reference_kind = 'published_at'
+    else:
+        reference = datetime.datetime.strptime(item['openTime'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=BEIJING_TZ)
+        reference_kind = 'open_time'
+    entry = {
+        'period': item['expect'],
+        'open_time': item['openTime'],
+        'reference': reference_kind,
+        'detected_at': detected_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'detected_ts': round(detected_at.timestamp(), 3),
+        'finished_ts': round(finished_at.timestamp(), 3),
+        'detect_lag': round((detected_at - reference).total_seconds(), 3),
+        'stages': {k: round(v, 4) for k, v in timings.items()},
+        'pipeline': round(sum(timings.values()), 4),
+        'end_to_end': round((finished_at - reference).total_seconds(), 3)
+    }
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    print(f"⏱️ 第 {entry['period']} 期：侦测延迟 {entry['detect_lag']:.1f}s | 流水线 {entry['pipeline']:.2f}s | 开奖到报告 {entry['end_to_end']:.1f}s")
+    return entry
+
+def watch(db_path='lottery.db', base_url=None, draw_time=DEFAULT_DRAW_TIME, fast_interval=10.0,
+          idle_interval=600.0, schedule=True, max_events=None):
+    """常驻监听：侦测到新期号后立即在进程内刷新报告。schedule=False 时始终快速轮询(用于本地替身联调)"""
+    print(f">>> 👀 开奖监听已启动 | 接口: {base_url or fetcher.API_BASE_URL} | 预计开奖: 北京时间 {draw_time}")
+    session = requests.Session()
+    events = []
+
+    while max_events is None or len(events) < max_events:
+        try:
+            item = poll_once(db_path, base_url=base_url, session=session)
+        except Exception as e:
+            print(f"    - 轮询失败: {e}")
+            item = None
+
+        if item is not None:
+            detected_at = datetime.datetime.now(BEIJING_TZ)
+            try:
+                timings = run_pipeline_in_process(db_path)
+            except Exception as e:
+                # 单期刷新失败不影响常驻监听，下一期照常处理
+                print(f"❌ 第 {item['expect']} 期报告刷新失败，继续监听: {e!r}")
+                continue
+            finished_at = datetime.datetime.now(BEIJING_TZ)
+            events.append(record_latency(item, detected_at, finished_at, timings))
+            continue
+
+        if not schedule:
+            time.sleep(fast_interval)
+            continue
+
+        now = datetime.datetime.now(BEIJING_TZ)
+        _, latest_time = get_latest_db_record(db_path)
+        caught_up = bool(latest_time) and latest_time[:10] == now.strftime('%Y-%m-%d')
+        time.sleep(next_poll_interval(now, draw_time, caught_up, fast_interval, idle_interval))
+
+    return events
+
+if __name__ == '__main__':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='ignore')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='ignore')
+
+    parser = argparse.ArgumentParser(description='开奖监听守护进程：新一期出现后立即刷新分析报告')
+    parser.add_argument('--db', default='lottery.db')
+    parser.add_argument('--base-url', default=None, help='开奖接口地址，可指向 mock_feed.py 启动的本地替身')
+    parser.add_argument('--draw-time', default=DEFAULT_DRAW_TIME, help='预计开奖时间 (北京时间 HH:MM)')
+    parser.add_argument('--fast-interval', type=float, default=10.0, help='开奖窗口内的轮询间隔(秒)')
+    parser.add_argument('--idle-interval', type=float, default=600.0, help='窗口外的最长休眠间隔(秒)')
+    parser.add_argument('--no-schedule', action='store_true', help='忽略开奖时刻，始终快速轮询')
+    parser.add_argument('--max-events', type=int, default=None, help='处理多少期后退出')
+    args = parser.parse_args()
+
+    try:
+        watch(db_path=args.db, base_url=args.base_url, draw_time=args.draw_time,
+              fast_interval=args.fast_interval, idle_interval=args.idle_interval,
+              schedule=not args.no_schedule, max_events=args.max_events)
+    except KeyboardInterrupt:
+        print("\n>>> 监听已停止。")